@@ -0,0 +1,59 @@
+"""adds travel coordinate columns
+
+Revision ID: a3f1c2d4e5b6
+Revises: 6c9960a3fe17
+Create Date: 2026-10-18 09:12:41.118204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f1c2d4e5b6"
+down_revision: Union[str, Sequence[str], None] = "6c9960a3fe17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("travel", sa.Column("origin_latitude", sa.Float(), nullable=True))
+    op.add_column("travel", sa.Column("origin_longitude", sa.Float(), nullable=True))
+    op.add_column("travel", sa.Column("destination_latitude", sa.Float(), nullable=True))
+    op.add_column("travel", sa.Column("destination_longitude", sa.Float(), nullable=True))
+
+    # Backfill from the JSON origin/destination columns
+    op.execute(
+        """
+        UPDATE travel SET
+            origin_latitude = (origin ->> 'latitude')::float,
+            origin_longitude = (origin ->> 'longitude')::float,
+            destination_latitude = (destination ->> 'latitude')::float,
+            destination_longitude = (destination ->> 'longitude')::float
+        """
+    )
+
+    op.create_index(
+        "ix_travel_origin_coordinates",
+        "travel",
+        ["origin_latitude", "origin_longitude"],
+    )
+    op.create_index(
+        "ix_travel_destination_coordinates",
+        "travel",
+        ["destination_latitude", "destination_longitude"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_travel_destination_coordinates", table_name="travel")
+    op.drop_index("ix_travel_origin_coordinates", table_name="travel")
+    op.drop_column("travel", "destination_longitude")
+    op.drop_column("travel", "destination_latitude")
+    op.drop_column("travel", "origin_longitude")
+    op.drop_column("travel", "origin_latitude")
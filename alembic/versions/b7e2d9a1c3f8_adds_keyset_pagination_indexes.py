@@ -0,0 +1,29 @@
+"""adds keyset pagination indexes
+
+Revision ID: b7e2d9a1c3f8
+Revises: a3f1c2d4e5b6
+Create Date: 2026-10-18 11:02:17.540921
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e2d9a1c3f8"
+down_revision: Union[str, Sequence[str], None] = "a3f1c2d4e5b6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_user_created_at_id", "user", ["created_at", "id"])
+    op.create_index("ix_travel_created_at_id", "travel", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_travel_created_at_id", table_name="travel")
+    op.drop_index("ix_user_created_at_id", table_name="user")
@@ -0,0 +1,31 @@
+"""adds travel updated_at
+
+Revision ID: c4d8e1f2a9b7
+Revises: b7e2d9a1c3f8
+Create Date: 2026-10-18 13:40:05.271638
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4d8e1f2a9b7"
+down_revision: Union[str, Sequence[str], None] = "b7e2d9a1c3f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("travel", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE travel SET updated_at = created_at")
+    op.alter_column("travel", "updated_at", nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("travel", "updated_at")
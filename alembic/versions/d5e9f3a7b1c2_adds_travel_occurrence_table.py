@@ -0,0 +1,40 @@
+"""adds travel occurrence table
+
+Revision ID: d5e9f3a7b1c2
+Revises: c4d8e1f2a9b7
+Create Date: 2026-10-18 15:21:48.903117
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d5e9f3a7b1c2"
+down_revision: Union[str, Sequence[str], None] = "c4d8e1f2a9b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled by the API on startup and kept current as travels are written
+    op.create_table(
+        "travel_occurrence",
+        sa.Column("travel_id", sa.String(), nullable=False),
+        sa.Column("departs_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["travel_id"], ["travel.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("travel_id", "departs_at"),
+    )
+    op.create_index(
+        "ix_travel_occurrence_departs_at", "travel_occurrence", ["departs_at", "travel_id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_travel_occurrence_departs_at", table_name="travel_occurrence")
+    op.drop_table("travel_occurrence")
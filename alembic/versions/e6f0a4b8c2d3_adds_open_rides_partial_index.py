@@ -0,0 +1,39 @@
+"""adds open rides partial index
+
+Revision ID: e6f0a4b8c2d3
+Revises: d5e9f3a7b1c2
+Create Date: 2026-10-18 16:47:12.385410
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e6f0a4b8c2d3"
+down_revision: Union[str, Sequence[str], None] = "d5e9f3a7b1c2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_travel_open_rides",
+        "travel",
+        [
+            "origin_latitude",
+            "origin_longitude",
+            "destination_latitude",
+            "destination_longitude",
+        ],
+        postgresql_where=sa.text("available_seats > 0"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_travel_open_rides", table_name="travel")
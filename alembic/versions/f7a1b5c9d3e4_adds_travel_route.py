@@ -0,0 +1,29 @@
+"""adds travel route
+
+Revision ID: f7a1b5c9d3e4
+Revises: e6f0a4b8c2d3
+Create Date: 2026-10-18 18:02:41.517233
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f7a1b5c9d3e4"
+down_revision: Union[str, Sequence[str], None] = "e6f0a4b8c2d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("travel", sa.Column("route", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("travel", "route")
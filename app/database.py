@@ -1,9 +1,24 @@
 import os
+import time
 from typing import Annotated
 
 from dotenv import load_dotenv
 from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.metrics import (
+    DB_POOL_CAPACITY,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUTS,
+    DB_POOL_SATURATION,
+    DB_POOL_WAIT_TIME,
+)
+from app.utils.query_stats import instrument_queries
 
 load_dotenv("compose/.env")
 
@@ -13,9 +28,98 @@ POSTGRES_DB = os.getenv("POSTGRES_DB")
 POSTGRES_HOST = os.getenv("POSTGRES_HOST")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT")
 
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
 postgres_url = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+async_postgres_url = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+class PoolWaitTimerMixin:
+    """Records how long callers wait for a pooled connection."""
+
+    metrics_name = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_TIME.labels(pool=self.metrics_name).observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(PoolWaitTimerMixin, QueuePool):
+    metrics_name = "sync"
+
+
+class InstrumentedAsyncQueuePool(PoolWaitTimerMixin, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+
+def instrument_pool(pool, name: str):
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    DB_POOL_CAPACITY.labels(pool=name).set(capacity)
 
-engine = create_engine(postgres_url, echo=True)
+    def update_usage():
+        checked_out = pool.checkedout()
+        DB_POOL_CHECKED_OUT.labels(pool=name).set(checked_out)
+        DB_POOL_SATURATION.labels(pool=name).set(checked_out / capacity if capacity else 0)
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.labels(pool=name).inc()
+        update_usage()
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        update_usage()
+
+
+pool_options = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+connect_args = {}
+async_connect_args = {}
+if DB_STATEMENT_TIMEOUT_MS:
+    connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    async_connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+
+engine = create_engine(
+    postgres_url,
+    echo=DB_ECHO,
+    poolclass=InstrumentedQueuePool,
+    connect_args=connect_args,
+    **pool_options,
+)
+instrument_pool(engine.pool, "sync")
+instrument_queries(engine)
+
+async_engine = create_async_engine(
+    async_postgres_url,
+    echo=DB_ECHO,
+    poolclass=InstrumentedAsyncQueuePool,
+    connect_args=async_connect_args,
+    **pool_options,
+)
+instrument_pool(async_engine.sync_engine.pool, "async")
+instrument_queries(async_engine.sync_engine)
+
+
+def is_foreign_key_violation(error: IntegrityError) -> bool:
+    """Whether a write referenced a missing row, or deleted a row still referenced."""
+    return getattr(error.orig, "sqlstate", None) == FOREIGN_KEY_VIOLATION
 
 
 def create_db_and_tables():
@@ -27,4 +131,10 @@ def get_session():
         yield session
 
 
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_session)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
@@ -1,23 +1,56 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette_prometheus import PrometheusMiddleware, metrics
 
-from app.database import create_db_and_tables
+from app.database import async_engine, create_db_and_tables
 from app.routes.auth import router as auth_router
 from app.routes.travel import router as travel_router
 from app.routes.user import router as user_router
+from app.utils.aws_utils import aws_clients, shutdown_aws_executors
+from app.utils.cache_utils import entity_cache
+from app.utils.occurrences import OCCURRENCE_REFRESH_SECONDS, refresh_occurrences
+from app.utils.query_stats import QueryStatsMiddleware
+from app.utils.route_matching import route_matcher
+from app.utils.search_cache import search_cache
+from app.utils.spatial_index import TRAVEL_INDEX_ENABLED, travel_index
+
+
+async def refresh_occurrences_periodically():
+    while True:
+        await asyncio.sleep(OCCURRENCE_REFRESH_SECONDS)
+        try:
+            async with AsyncSession(async_engine) as session:
+                await refresh_occurrences(session)
+        except Exception as error:
+            print(f"Could not refresh travel occurrences: {error}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     create_db_and_tables()
+    aws_clients.start()
+    if TRAVEL_INDEX_ENABLED:
+        async with AsyncSession(async_engine) as session:
+            await travel_index.rebuild(session)
+            await route_matcher.rebuild(session)
+    async with AsyncSession(async_engine) as session:
+        await refresh_occurrences(session)
+    occurrence_refresher = asyncio.create_task(refresh_occurrences_periodically())
     yield
     # Shutdown
-    pass
+    occurrence_refresher.cancel()
+    shutdown_aws_executors()
+    aws_clients.close()
+    await entity_cache.close()
+    await search_cache.close()
+    await async_engine.dispose()
 
 
 swagger_ui_parameters = {
@@ -35,6 +68,7 @@ app = FastAPI(
     openapi_url="/openapi.json",
     swagger_ui_parameters=swagger_ui_parameters,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -45,6 +79,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(PrometheusMiddleware)
+app.add_middleware(QueryStatsMiddleware)
 
 app.add_route("/metrics", metrics)
 
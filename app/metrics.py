@@ -0,0 +1,66 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total",
+    "Total count of connections checked out from the pool.",
+    ["pool"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out",
+    "Gauge of connections currently checked out from the pool.",
+    ["pool"],
+)
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_capacity",
+    "Maximum number of connections the pool may open (size + overflow).",
+    ["pool"],
+)
+DB_POOL_SATURATION = Gauge(
+    "db_pool_saturation_ratio",
+    "Checked out connections divided by the pool capacity.",
+    ["pool"],
+)
+DB_POOL_WAIT_TIME = Histogram(
+    "db_pool_wait_time_seconds",
+    "Histogram of time spent waiting for a pooled connection (in seconds).",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+AWS_EXECUTOR_QUEUE_DEPTH = Gauge(
+    "aws_executor_queue_depth",
+    "Gauge of AWS calls waiting for a free executor thread.",
+    ["service"],
+)
+AWS_EXECUTOR_IN_FLIGHT = Gauge(
+    "aws_executor_in_flight",
+    "Gauge of AWS calls currently running on an executor thread.",
+    ["service"],
+)
+AWS_CALL_DURATION = Histogram(
+    "aws_call_duration_seconds",
+    "Histogram of AWS call duration by service, including queueing (in seconds).",
+    ["service"],
+)
+AWS_CALL_FAILURES = Counter(
+    "aws_call_failures_total",
+    "Total count of AWS calls that timed out or were rejected by a full executor.",
+    ["service", "reason"],
+)
+DB_REQUEST_QUERIES = Histogram(
+    "db_request_queries",
+    "Histogram of SQL statements executed per request by method and path.",
+    ["method", "path_template"],
+    buckets=(0, 1, 2, 3, 4, 5, 10, 20, 50, 100),
+)
+DB_REQUEST_TIME = Histogram(
+    "db_request_time_seconds",
+    "Histogram of time spent in SQL statements per request by method and path (in seconds).",
+    ["method", "path_template"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_REQUEST_SLOWEST_QUERY = Histogram(
+    "db_request_slowest_query_seconds",
+    "Histogram of the slowest SQL statement of each request by method and path (in seconds).",
+    ["method", "path_template"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
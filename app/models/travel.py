@@ -1,19 +1,41 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from sqlalchemy.dialects.postgresql import ARRAY
-from sqlmodel import JSON, Column, Field, String
+from sqlmodel import JSON, Column, Field, Index, String, text
 
 from app.models.base import BaseModel
 from app.types.travel import Location
 
 
 class Travel(BaseModel, table=True):
+    __table_args__ = (
+        Index("ix_travel_origin_coordinates", "origin_latitude", "origin_longitude"),
+        Index("ix_travel_destination_coordinates", "destination_latitude", "destination_longitude"),
+        Index("ix_travel_created_at_id", "created_at", "id"),
+        # Searches ask for min_seats >= 1 by default, so they only touch rides with seats left
+        Index(
+            "ix_travel_open_rides",
+            "origin_latitude",
+            "origin_longitude",
+            "destination_latitude",
+            "destination_longitude",
+            postgresql_where=text("available_seats > 0"),
+        ),
+    )
+
     id: str = Field(default=None, primary_key=True)
     id_driver: str = Field(foreign_key="user.id")
 
     origin: Location = Field(default_factory=dict, sa_column=Column(JSON))
     destination: Location = Field(default_factory=dict, sa_column=Column(JSON))
+    # Denormalized copies of origin/destination used by the indexed radius search
+    origin_latitude: Optional[float] = Field(default=None)
+    origin_longitude: Optional[float] = Field(default=None)
+    destination_latitude: Optional[float] = Field(default=None)
+    destination_longitude: Optional[float] = Field(default=None)
+    # Simplified path from origin to destination, as a list of locations
+    route: Optional[List[Dict[str, float]]] = Field(default=None, sa_column=Column(JSON))
     days_of_week: Optional[List[str]] = Field(sa_column=Column(ARRAY(String)))
     price: float = Field()
     available_seats: int = Field()
@@ -21,3 +43,34 @@ class Travel(BaseModel, table=True):
     description: str = Field()
     start_time: datetime = Field()
     created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
+class TravelOccurrence(BaseModel, table=True):
+    """One concrete departure of a travel, materialized for a rolling window."""
+
+    __tablename__ = "travel_occurrence"
+    __table_args__ = (Index("ix_travel_occurrence_departs_at", "departs_at", "travel_id"),)
+
+    travel_id: str = Field(foreign_key="travel.id", primary_key=True, ondelete="CASCADE")
+    departs_at: datetime = Field(primary_key=True)
+
+
+def coordinate_fields(data: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Build the denormalized coordinate columns for the origin and/or
+    destination present in a travel payload.
+
+    Parameters:
+        data: dict with optional "origin" and "destination" locations
+
+    Returns:
+        Dict mapping coordinate column names to their values
+    """
+    fields = {}
+    for name in ("origin", "destination"):
+        location = data.get(name)
+        if location:
+            fields[f"{name}_latitude"] = location["latitude"]
+            fields[f"{name}_longitude"] = location["longitude"]
+    return fields
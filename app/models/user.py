@@ -2,12 +2,13 @@ from datetime import datetime
 from typing import Union
 
 from fastapi import File
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field, Index, SQLModel
 
 from app.models.base import BaseModel
 
 
 class User(BaseModel, table=True):
+    __table_args__ = (Index("ix_user_created_at_id", "created_at", "id"),)
 
     id: str = Field(default=None, primary_key=True)
     name: str = Field()
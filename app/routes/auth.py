@@ -1,7 +1,8 @@
-import boto3
 from fastapi import APIRouter, Depends, Form, HTTPException, Query
-from sqlmodel import Session, select
-from app.database import get_session
+from starlette.concurrency import run_in_threadpool
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 
 from app.types.auth import JWTAuthCredentials, UserConfirm, UserTokens
 from app.models.user import User
@@ -11,36 +12,41 @@ from app.utils.auth_utils import (
     get_auth_error_message,
     get_auth_secrets,
 )
+from app.utils.aws_utils import get_aws_client, run_aws_call
 
 router = APIRouter()
 
 
 @router.post("/login")
-def login(
+async def login(
     email: str = Query(...),
     password: str = Query(...),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     try:
         username = email.lower().split("@")[0]
 
-        user = session.exec(select(User).where(User.email == email)).first()
+        user = (await session.exec(select(User).where(User.email == email))).first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         user_id = user.id
 
-        secret_hash = calc_secret(username=username)
+        # Both may block on a Secrets Manager fetch
+        auth_secrets = await run_in_threadpool(get_auth_secrets)
+        secret_hash = await run_in_threadpool(calc_secret, username=username)
 
         params = {
             "USERNAME": username,
             "PASSWORD": password,
             "SECRET_HASH": secret_hash,
         }
-        cognito_client = boto3.session.Session().client("cognito-idp")
-        resp = cognito_client.initiate_auth(
+        cognito_client = get_aws_client("cognito-idp")
+        resp = await run_aws_call(
+            "cognito-idp",
+            cognito_client.initiate_auth,
             AuthFlow="USER_PASSWORD_AUTH",
             AuthParameters=params,
-            ClientId=get_auth_secrets()["client_id"],
+            ClientId=auth_secrets["client_id"],
         )
         print(resp)
         response = {**UserTokens(**resp["AuthenticationResult"]).model_dump(), "user_id": user_id}
@@ -55,17 +61,21 @@ def login(
 
 
 @router.post("/verify_email")
-def verify_email(
+async def verify_email(
     email: str = Query(...),
     code: str = Query(...),
 ):
     try:
         username = email.lower().split("@")[0]
-        secret_hash = calc_secret(username=username)
-
-        cognito_client = boto3.session.Session().client("cognito-idp")
-        resp = cognito_client.confirm_sign_up(
-            ClientId=get_auth_secrets()["client_id"],
+        # Both may block on a Secrets Manager fetch
+        auth_secrets = await run_in_threadpool(get_auth_secrets)
+        secret_hash = await run_in_threadpool(calc_secret, username=username)
+
+        cognito_client = get_aws_client("cognito-idp")
+        resp = await run_aws_call(
+            "cognito-idp",
+            cognito_client.confirm_sign_up,
+            ClientId=auth_secrets["client_id"],
             SecretHash=secret_hash,
             Username=username,
             ConfirmationCode=code,
@@ -82,11 +92,13 @@ def verify_email(
 
 
 @router.post("/logout")
-def logout(claims: JWTAuthCredentials = Depends(auth_bearer)):
+async def logout(claims: JWTAuthCredentials = Depends(auth_bearer)):
     try:
         access_token = claims.jwt_token
-        cognito_client = boto3.session.Session().client("cognito-idp")
-        _ = cognito_client.global_sign_out(AccessToken=access_token)
+        cognito_client = get_aws_client("cognito-idp")
+        _ = await run_aws_call(
+            "cognito-idp", cognito_client.global_sign_out, AccessToken=access_token
+        )
     except Exception:
         return HTTPException(
             status_code=500,
@@ -96,15 +108,16 @@ def logout(claims: JWTAuthCredentials = Depends(auth_bearer)):
 
 
 @router.patch("/change_password")
-def change_password(
+async def change_password(
     old_password: str = Query(...),
     new_password: str = Query(...),
     claims: JWTAuthCredentials = Depends(auth_bearer),
 ):
     try:
         username = claims.claims["username"]
-        secret_hash = calc_secret(username=username)
-        auth_secrets = get_auth_secrets()
+        # Both may block on a Secrets Manager fetch
+        auth_secrets = await run_in_threadpool(get_auth_secrets)
+        secret_hash = await run_in_threadpool(calc_secret, username=username)
 
         params = {
             "AuthFlow": "USER_PASSWORD_AUTH",
@@ -115,9 +128,11 @@ def change_password(
             },
             "ClientId": auth_secrets["client_id"],
         }
-        cognito_client = boto3.session.Session().client("cognito-idp")
-        _ = cognito_client.initiate_auth(**params)
-        _ = cognito_client.set_user_password(
+        cognito_client = get_aws_client("cognito-idp")
+        _ = await run_aws_call("cognito-idp", cognito_client.initiate_auth, **params)
+        _ = await run_aws_call(
+            "cognito-idp",
+            cognito_client.set_user_password,
             UserPoolId=auth_secrets["user_pool_id"],
             Username=username,
             Password=new_password,
@@ -1,50 +1,726 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlmodel import Session, select
+import numpy as np
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, case, column, delete, insert, literal_column, or_, update, values
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from app.database import get_session
-from app.models.travel import Travel
+from app.database import async_engine, get_async_session, is_foreign_key_violation
+from app.models.travel import Travel, TravelOccurrence, coordinate_fields
 from app.models.user import User
 from app.types.auth import JWTAuthCredentials
-from app.types.travel import TravelCreate, TravelPatch, TravelResponse
+from app.types.pagination import Page
+from app.types.travel import (
+    TravelBulkCreate,
+    TravelBulkPatch,
+    TravelBulkResponse,
+    TravelBulkResult,
+    TravelCreate,
+    TravelMatchResult,
+    TravelPatch,
+    TravelResponse,
+    TravelSearchResult,
+    UTCDatetime,
+    naive_utc,
+    utc_now,
+)
 from app.utils.auth_utils import auth_bearer
-from app.utils.utils import haversine_distance
+from app.utils.cache_utils import entity_cache, pack_entity, travel_key, unpack_entity
+from app.utils.etags import check_if_match, collection_etag, entity_etag, etag_matches, not_modified
+from app.utils.occurrences import (
+    add_occurrences,
+    departs_between,
+    nearest_departure,
+    sync_occurrences,
+)
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+)
+from app.utils.responses import ModelResponse
+from app.utils.route_matching import (
+    ROUTE_MATCH_MAX_RADIUS,
+    route_field,
+    route_matcher,
+    travel_route,
+)
+from app.utils.search_cache import (
+    SEARCH_CACHE_ENABLED,
+    SEARCH_CACHE_MAX_CANDIDATES,
+    TOO_MANY,
+    pack_candidates,
+    search_cache,
+)
+from app.utils.spatial_index import travel_index
+from app.utils.utils import bounding_box, haversine_distances, top_k_indices, within_radius
+
+STREAM_BATCH_SIZE = 500
+FULL_STATUS = "full"
+# Route matches are loaded this many pages at a time
+MATCH_BATCH_PAGES = 4
+# Meters of extra distance that one minute away from the wanted departure is worth
+DEFAULT_TIME_WEIGHT = 50.0
 
 router = APIRouter(
     dependencies=[Depends(auth_bearer)],
 )
 
 
-@router.post("/", status_code=status.HTTP_201_CREATED)
-def create_travel(
+def route_columns(travel: Travel) -> Dict[str, Any]:
+    return {"origin": travel.origin, "destination": travel.destination, "route": travel.route}
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=TravelResponse)
+async def create_travel(
     travel: TravelCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
 
-    new_travel = Travel(**travel.model_dump(), id=str(uuid4()))
+    travel_data = travel.model_dump()
+    travel_data["route"] = route_field(
+        travel_data["origin"], travel_data["destination"], travel_data["route"]
+    )
+    new_travel = Travel(**travel_data, **coordinate_fields(travel_data), id=str(uuid4()))
 
-    user = session.exec(select(User).where(User.id == travel.id_driver)).first()
-    if not user:
+    session.add(new_travel)
+    try:
+        # The foreign key checks the driver exists, without a lookup of its own
+        await session.flush()
+    except IntegrityError as error:
+        await session.rollback()
+        if not is_foreign_key_violation(error):
+            raise
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    session.add(new_travel)
-    session.commit()
-    session.refresh(new_travel)
+    await add_occurrences(
+        session, [(new_travel.id, new_travel.start_time, new_travel.days_of_week)]
+    )
+    await session.commit()
+    travel_index.add(new_travel.id, new_travel.origin, new_travel.destination)
+    if route_matcher.ready:
+        await run_in_threadpool(
+            route_matcher.add, new_travel.id, travel_route(**route_columns(new_travel))
+        )
+    await search_cache.invalidate(new_travel.origin)
+
+    return ModelResponse(
+        TravelResponse.model_validate(new_travel), status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.post("/bulk", response_model=TravelBulkResponse)
+async def create_travels(
+    payload: TravelBulkCreate,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Create many travels with one driver lookup and one multi-row INSERT."""
+    driver_ids = {item.id_driver for item in payload.items}
+    drivers = set((await session.exec(select(User.id).where(User.id.in_(driver_ids)))).all())
+
+    now = datetime.now()
+    rows = []
+    results = []
+    for index, item in enumerate(payload.items):
+        if item.id_driver not in drivers:
+            results.append(
+                TravelBulkResult(index=index, status_code=404, detail="Driver not found")
+            )
+            continue
+
+        travel_data = item.model_dump()
+        travel_data["route"] = route_field(
+            travel_data["origin"], travel_data["destination"], travel_data["route"]
+        )
+        row = {
+            **travel_data,
+            **coordinate_fields(travel_data),
+            "id": str(uuid4()),
+            "created_at": now,
+            "updated_at": now,
+        }
+        rows.append(row)
+        results.append(
+            TravelBulkResult(
+                index=index,
+                status_code=status.HTTP_201_CREATED,
+                travel=TravelResponse.model_validate(row),
+            )
+        )
+
+    if rows:
+        await session.exec(insert(Travel).values(rows))
+        await add_occurrences(
+            session, [(row["id"], row["start_time"], row["days_of_week"]) for row in rows]
+        )
+        await session.commit()
+        for row in rows:
+            travel_index.add(row["id"], row["origin"], row["destination"])
+        if route_matcher.ready:
+            await run_in_threadpool(
+                route_matcher.add_many,
+                [
+                    (row["id"], travel_route(row["origin"], row["destination"], row["route"]))
+                    for row in rows
+                ],
+            )
+        await search_cache.invalidate(*(row["origin"] for row in rows))
+
+    return ModelResponse(TravelBulkResponse(results=results))
+
+
+def bulk_update_statement(fields: Tuple[str, ...], rows: Dict[str, Dict[str, Any]]):
+    """
+    Build one UPDATE ... FROM (VALUES ...) RETURNING for travels patching the same fields.
+
+    Parameters:
+        fields: column names set by every row
+        rows: column values keyed by travel id
+
+    Returns:
+        An update statement returning the updated Travel rows
+    """
+    columns = Travel.__table__.c
+    patch = values(
+        column("id", columns.id.type),
+        *(column(name, columns[name].type) for name in fields),
+        name="patch",
+    ).data([(travel_id, *(row[name] for name in fields)) for travel_id, row in rows.items()])
+
+    return (
+        update(Travel)
+        .where(Travel.id == patch.c.id)
+        .values({name: patch.c[name] for name in fields})
+        .returning(Travel)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+
+@router.patch("/bulk", response_model=TravelBulkResponse)
+async def update_travels(
+    payload: TravelBulkPatch,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Patch many travels in one transaction, one UPDATE per distinct set of fields."""
+    ids = {item.id for item in payload.items}
+    # Origins before the patch: searches around a moved travel's old spot change too
+    existing = dict(
+        (await session.exec(select(Travel.id, Travel.origin).where(Travel.id.in_(ids)))).all()
+    )
+
+    # Items are grouped by the fields they set; a travel listed twice with
+    # the same fields keeps the last patch, as if applied in order.
+    now = datetime.now()
+    groups: Dict[Tuple[str, ...], Dict[str, Dict[str, Any]]] = {}
+    # Routes depend on the final origin and destination, so they are
+    # rebuilt once the other fields are written
+    rerouted: Dict[str, Optional[list]] = {}
+    for item in payload.items:
+        if item.id in existing:
+            travel_data = item.model_dump(exclude_unset=True, exclude={"id"})
+            if {"route", "origin", "destination"} & travel_data.keys():
+                rerouted[item.id] = travel_data.pop("route", None)
+            travel_data.update(coordinate_fields(travel_data))
+            travel_data["updated_at"] = now
+            groups.setdefault(tuple(sorted(travel_data)), {})[item.id] = travel_data
+
+    travels = {}
+    rescheduled = set()
+    for fields, rows in groups.items():
+        updated = await session.exec(bulk_update_statement(fields, rows))
+        travels.update((travel.id, travel) for travel in updated.scalars())
+        if "start_time" in fields or "days_of_week" in fields:
+            rescheduled.update(rows)
+
+    if rerouted:
+        routes = {
+            travel_id: {
+                "route": route_field(
+                    travels[travel_id].origin, travels[travel_id].destination, route
+                )
+            }
+            for travel_id, route in rerouted.items()
+        }
+        updated = await session.exec(bulk_update_statement(("route",), routes))
+        travels.update((travel.id, travel) for travel in updated.scalars())
+
+    if travels:
+        await sync_occurrences(
+            session,
+            [
+                (travel_id, travels[travel_id].start_time, travels[travel_id].days_of_week)
+                for travel_id in rescheduled
+            ],
+        )
+        await session.commit()
+        for rows in groups.values():
+            for travel_id, travel_data in rows.items():
+                travel_index.update(
+                    travel_id, travel_data.get("origin"), travel_data.get("destination")
+                )
+        if route_matcher.ready:
+            await run_in_threadpool(
+                route_matcher.add_many,
+                [
+                    (travel_id, travel_route(**route_columns(travels[travel_id])))
+                    for travel_id in rerouted
+                ],
+            )
+        await search_cache.invalidate(
+            *(existing[travel_id] for travel_id in travels),
+            *(travel.origin for travel in travels.values()),
+        )
+        await entity_cache.invalidate(*(travel_key(travel_id) for travel_id in travels))
+
+    results = []
+    for index, item in enumerate(payload.items):
+        travel = travels.get(item.id)
+        if travel is None:
+            results.append(
+                TravelBulkResult(index=index, status_code=404, detail="Travel not found")
+            )
+        else:
+            results.append(
+                TravelBulkResult(
+                    index=index, status_code=200, travel=TravelResponse.model_validate(travel)
+                )
+            )
+
+    return ModelResponse(TravelBulkResponse(results=results))
+
+
+def match_travels(rows, origin, destination, radius):
+    """
+    Exact radius check of (Travel, User) rows against both search circles.
+
+    Parameters:
+        rows: sequence of (Travel, User) tuples
+        origin: tuple of float (lon, lat)
+        destination: tuple of float (lon, lat)
+        radius: float radius in meters
+
+    Returns:
+        Indexes of the matching rows, in order
+    """
+    origins = [(travel.origin["longitude"], travel.origin["latitude"]) for travel, _ in rows]
+    destinations = [
+        (travel.destination["longitude"], travel.destination["latitude"]) for travel, _ in rows
+    ]
+    matches = within_radius(origins, origin, radius)
+    matches[matches] = within_radius(np.asarray(destinations)[matches], destination, radius)
+    return np.flatnonzero(matches)
+
+
+def search_statement(
+    origin_latitude: float,
+    origin_longitude: float,
+    destination_latitude: float,
+    destination_longitude: float,
+    radius: int,
+    departure_after: Optional[datetime] = None,
+    departure_before: Optional[datetime] = None,
+    travel_status: Optional[str] = None,
+    min_seats: int = 1,
+):
+    """
+    Build the candidate query for a radius search, restricted to travels
+    departing in [departure_after, departure_before) with at least
+    min_seats free seats. departure_after defaults to now (in UTC), so past
+    rides are left out unless asked for.
+
+    Returns:
+        A select of (Travel, User) rows, or None when the spatial index
+        already knows that nothing can match
+    """
+    o_min_lat, o_max_lat, o_min_lon, o_max_lon = bounding_box(
+        origin_latitude, origin_longitude, radius
+    )
+    d_min_lat, d_max_lat, d_min_lon, d_max_lon = bounding_box(
+        destination_latitude, destination_longitude, radius
+    )
+
+    # Bounding boxes hit the coordinate indexes; the exact radius check
+    # only runs on the rows inside both boxes.
+    stmt = (
+        select(Travel, User)
+        .join(User, Travel.id_driver == User.id)
+        .where(
+            Travel.origin_latitude.between(o_min_lat, o_max_lat),
+            Travel.origin_longitude.between(o_min_lon, o_max_lon),
+            Travel.destination_latitude.between(d_min_lat, d_max_lat),
+            Travel.destination_longitude.between(d_min_lon, d_max_lon),
+        )
+    )
+    if travel_index.ready:
+        candidate_ids = travel_index.candidates(
+            (origin_latitude, origin_longitude),
+            (destination_latitude, destination_longitude),
+            radius,
+        )
+        if not candidate_ids:
+            return None
+        stmt = stmt.where(Travel.id.in_(list(candidate_ids)))
+
+    return filter_statement(stmt, departure_after, departure_before, travel_status, min_seats)
+
+
+def filter_statement(
+    stmt,
+    departure_after: Optional[datetime] = None,
+    departure_before: Optional[datetime] = None,
+    travel_status: Optional[str] = None,
+    min_seats: int = 1,
+):
+    """Apply the departure, status and seat filters shared by the search endpoints."""
+    if travel_status is not None:
+        stmt = stmt.where(Travel.status == travel_status)
+    if min_seats > 0:
+        # min_seats is a bind parameter, which a generic plan cannot prove
+        # positive; the inline literal lets it use the partial
+        # ix_travel_open_rides index
+        stmt = stmt.where(
+            Travel.available_seats > literal_column("0"),
+            Travel.available_seats >= min_seats,
+        )
+
+    # One-off travels (and the first departure of recurring ones) match on
+    # start_time; later recurring departures on their materialized occurrences.
+    departure_after = departure_after or utc_now()
+    departs_once = Travel.start_time >= departure_after
+    departs = select(TravelOccurrence.travel_id).where(
+        TravelOccurrence.travel_id == Travel.id,
+        TravelOccurrence.departs_at >= departure_after,
+    )
+    if departure_before:
+        departs_once = and_(departs_once, Travel.start_time < departure_before)
+        departs = departs.where(TravelOccurrence.departs_at < departure_before)
+    stmt = stmt.where(or_(departs_once, departs.exists()))
+
+    return stmt
+
+
+def search_item(travel: Travel, user: User, score: Optional[float] = None) -> TravelSearchResult:
+    item = TravelSearchResult.model_validate(travel)
+    item.driver_name = user.name
+    item.driver_phone = user.phone
+    item.score = score
+    return item
+
+
+def search_etag(matched, next_cursor: Optional[str] = None) -> str:
+    # The driver's contact is part of each item, so their row version counts too
+    return collection_etag(
+        [
+            version
+            for travel, user in matched
+            for version in ((travel.id, travel.updated_at), (user.id, user.updated_at))
+        ],
+        next_cursor,
+    )
+
+
+def search_page(matched, if_none_match: Optional[str], next_cursor=None, scores=None):
+    """
+    Build the search response for (Travel, User) rows, or a 304 when the
+    client already has this page.
+    """
+    etag = search_etag(matched, next_cursor)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    scores = scores or [None] * len(matched)
+    return ModelResponse(
+        Page[TravelSearchResult](
+            items=[
+                search_item(travel, user, score) for (travel, user), score in zip(matched, scores)
+            ],
+            next_cursor=next_cursor,
+        ),
+        headers={"ETag": etag},
+    )
+
+
+def score_rows(
+    rows,
+    origin,
+    destination,
+    radius: int,
+    departure_time: Optional[datetime] = None,
+    time_weight: float = DEFAULT_TIME_WEIGHT,
+    coords: Optional[np.ndarray] = None,
+):
+    """
+    Exact radius check and top_k score of (id, origin lon, origin lat,
+    destination lon, destination lat, start_time, days_of_week, ...) rows.
+
+    Pass coords when the rows' coordinates are already in an (N, 4) array.
+
+    Returns:
+        Tuple of arrays (indexes of the rows inside both circles, their scores)
+    """
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    if coords is None:
+        coords = np.array([row[1:5] for row in rows], dtype=np.float64)
+    distances = haversine_distances(coords[:, 0:2], origin)
+    destination_distances = haversine_distances(coords[:, 2:4], destination)
+    inside = np.flatnonzero((distances <= radius) & (destination_distances <= radius))
+
+    scores = distances[inside] + destination_distances[inside]
+    if departure_time is not None and inside.size:
+        # start_time is naive UTC
+        departure_time = naive_utc(departure_time)
+        minutes = [
+            abs(nearest_departure(rows[i][5], rows[i][6], departure_time) - departure_time)
+            / timedelta(minutes=1)
+            for i in inside
+        ]
+        scores += time_weight * np.asarray(minutes)
 
-    response = TravelResponse(**new_travel.model_dump())
-    return response
+    return inside, scores
 
 
-@router.get("/", response_model=list[dict])  # raw dict for now
-def list_travels(
+async def rank_travels(
+    session: AsyncSession,
+    stmt,
+    origin,
+    destination,
+    radius: int,
+    top_k: int,
+    departure_time: Optional[datetime] = None,
+    time_weight: float = DEFAULT_TIME_WEIGHT,
+):
+    """
+    Find the top_k candidates closest to the passenger's trip.
+
+    Only ids, coordinates and schedules are read; candidates are scored a
+    batch at a time and just the best top_k so far are kept between batches.
+
+    Parameters:
+        session: session to read with
+        stmt: candidate select from search_statement
+        origin: tuple of float (lon, lat)
+        destination: tuple of float (lon, lat)
+        radius: float radius in meters
+        top_k: number of travels to return
+        departure_time: wanted departure; when set, each minute between it
+            and the travel's nearest departure adds time_weight meters
+        time_weight: meters per minute of departure difference
+
+    Returns:
+        List of (travel_id, score) tuples, best first
+    """
+    columns = stmt.with_only_columns(
+        Travel.id,
+        Travel.origin_longitude,
+        Travel.origin_latitude,
+        Travel.destination_longitude,
+        Travel.destination_latitude,
+        Travel.start_time,
+        Travel.days_of_week,
+    )
+    best_ids = np.empty(0, dtype=object)
+    best_scores = np.empty(0, dtype=np.float64)
+
+    result = await session.stream(columns.execution_options(yield_per=STREAM_BATCH_SIZE))
+    async for rows in result.partitions():
+        inside, scores = score_rows(rows, origin, destination, radius, departure_time, time_weight)
+        if not inside.size:
+            continue
+
+        ids = np.empty(inside.size, dtype=object)
+        ids[:] = [rows[i][0] for i in inside]
+        best_ids = np.concatenate([best_ids, ids])
+        best_scores = np.concatenate([best_scores, scores])
+        keep = top_k_indices(best_scores, top_k)
+        best_ids, best_scores = best_ids[keep], best_scores[keep]
+
+    return list(zip(best_ids.tolist(), best_scores.tolist()))
+
+
+def search_candidate(travel: Travel, user: User) -> tuple:
+    return (
+        travel.id,
+        travel.origin_longitude,
+        travel.origin_latitude,
+        travel.destination_longitude,
+        travel.destination_latitude,
+        travel.start_time,
+        travel.days_of_week,
+        travel.created_at,
+        travel.updated_at,
+        user.id,
+        user.updated_at,
+    )
+
+
+async def cached_search(
+    session: AsyncSession,
     origin_latitude: float,
     origin_longitude: float,
     destination_latitude: float,
     destination_longitude: float,
     radius: int,
-    session: Session = Depends(get_session),
+    departure_after: Optional[datetime],
+    departure_before: Optional[datetime],
+    travel_status: Optional[str],
+    min_seats: int,
+    cursor: Optional[str],
+    limit: int,
+    top_k: Optional[int],
+    departure_time: Optional[datetime],
+    time_weight: float,
+    if_none_match: Optional[str],
 ):
+    """
+    Answer a search from the cached candidates of its area, running the
+    widened search only on a miss.
+
+    Returns:
+        The response, or None when the search cannot be served from the
+        cache (radius too large, or too many candidates in the area)
+    """
+    # Compared below with the cached naive start times
+    departure_after = naive_utc(departure_after) if departure_after else utc_now()
+    departure_before = departure_before and naive_utc(departure_before)
+    area = await search_cache.area(
+        (origin_latitude, origin_longitude),
+        (destination_latitude, destination_longitude),
+        radius,
+        departure_after,
+        departure_before,
+        travel_status,
+        min_seats,
+    )
+    if area is None:
+        return None
+
+    async def load():
+        stmt = search_statement(
+            *area.origin,
+            *area.destination,
+            area.radius,
+            area.departure_after,
+            area.departure_before,
+            travel_status,
+            min_seats,
+        )
+        if stmt is None:
+            return pack_candidates([], [])
+        rows = (
+            await session.exec(
+                stmt.order_by(Travel.created_at.desc(), Travel.id.desc()).limit(
+                    SEARCH_CACHE_MAX_CANDIDATES + 1
+                )
+            )
+        ).all()
+        if len(rows) > SEARCH_CACHE_MAX_CANDIDATES:
+            return TOO_MANY
+        return pack_candidates(
+            [search_candidate(travel, user) for travel, user in rows],
+            [search_item(travel, user).model_dump_json() for travel, user in rows],
+        )
+
+    candidate_set = await search_cache.load(area, load)
+    if candidate_set is None:
+        return None
+    candidates, items = candidate_set.candidates, candidate_set.items
+
+    inside, scores = score_rows(
+        candidates,
+        (origin_longitude, origin_latitude),
+        (destination_longitude, destination_latitude),
+        radius,
+        departure_time if top_k else None,
+        time_weight,
+        candidate_set.coords,
+    )
+    # The entry's window starts up to a window earlier than this search;
+    # only rides departing once before departure_after need a closer look
+    departs = candidate_set.start_times[inside] >= np.datetime64(departure_after)
+    if departure_before:
+        departs &= candidate_set.start_times[inside] < np.datetime64(departure_before)
+    for j in np.flatnonzero(~departs):
+        candidate = candidates[inside[j]]
+        departs[j] = departs_between(candidate[5], candidate[6], departure_after, departure_before)
+    inside, scores = inside[departs], scores[departs]
+
+    next_cursor = None
+    if top_k:
+        best = top_k_indices(scores, top_k)
+        page, page_scores = inside[best].tolist(), scores[best].tolist()
+    else:
+        if cursor:
+            after = decode_cursor(cursor)
+            inside = [i for i in inside if (candidates[i][7], candidates[i][0]) < after]
+        page, page_scores = list(inside[:limit]), None
+        if len(page) == limit:
+            next_cursor = encode_cursor(candidates[page[-1]][7], candidates[page[-1]][0])
+
+    etag = collection_etag(
+        [
+            version
+            for i in page
+            for version in (
+                (candidates[i][0], candidates[i][8]),
+                (candidates[i][9], candidates[i][10]),
+            )
+        ],
+        next_cursor,
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    if page_scores is None:
+        page_items = [items[i] for i in page]
+    else:
+        page_items = [
+            orjson.dumps(dict(orjson.loads(items[i]), score=score)).decode()
+            for i, score in zip(page, page_scores)
+        ]
+    # Same bytes as ModelResponse(Page[TravelSearchResult](...)), without
+    # decoding the cached items
+    body = b'{"items":[%s],"next_cursor":%s}' % (
+        ",".join(page_items).encode(),
+        orjson.dumps(next_cursor),
+    )
+    return ModelResponse(body, headers={"ETag": etag})
+
+
+@router.get("/", response_model=Page[TravelSearchResult])
+async def list_travels(
+    origin_latitude: float,
+    origin_longitude: float,
+    destination_latitude: float,
+    destination_longitude: float,
+    radius: int,
+    departure_after: Optional[UTCDatetime] = Query(None),
+    departure_before: Optional[UTCDatetime] = Query(None),
+    travel_status: Optional[str] = Query(None, alias="status"),
+    min_seats: int = Query(1, ge=0),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    top_k: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    departure_time: Optional[UTCDatetime] = Query(None),
+    time_weight: float = Query(DEFAULT_TIME_WEIGHT, ge=0),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Radius search, newest first and keyset-paginated. With top_k, returns
+    instead the top_k best matches by origin plus destination distance,
+    optionally adding departure_time proximity, in a single page.
+    """
     if origin_latitude is None or origin_longitude is None:
         raise HTTPException(status_code=400, detail="Both origin latitude and longitude required")
     if destination_latitude is None or destination_longitude is None:
@@ -52,71 +728,370 @@ def list_travels(
             status_code=400, detail="Both destination latitude and longitude required"
         )
 
-    stmt = select(Travel, User).join(User, Travel.id_driver == User.id)
-    results = session.exec(stmt).all()
+    if SEARCH_CACHE_ENABLED:
+        response = await cached_search(
+            session,
+            origin_latitude,
+            origin_longitude,
+            destination_latitude,
+            destination_longitude,
+            radius,
+            departure_after,
+            departure_before,
+            travel_status,
+            min_seats,
+            cursor,
+            limit,
+            top_k,
+            departure_time,
+            time_weight,
+            if_none_match,
+        )
+        if response is not None:
+            return response
 
-    filtered_results = []
-    for travel, user in results:
-        if (
-            haversine_distance(
-                (travel.origin["longitude"], travel.origin["latitude"]),
-                (origin_longitude, origin_latitude),
-            )
-            <= radius
-            and haversine_distance(
-                (travel.destination["longitude"], travel.destination["latitude"]),
-                (destination_longitude, destination_latitude),
-            )
-            <= radius
+    stmt = search_statement(
+        origin_latitude,
+        origin_longitude,
+        destination_latitude,
+        destination_longitude,
+        radius,
+        departure_after,
+        departure_before,
+        travel_status,
+        min_seats,
+    )
+    if stmt is None:
+        return search_page([], if_none_match)
+
+    if top_k:
+        ranked = await rank_travels(
+            session,
+            stmt,
+            (origin_longitude, origin_latitude),
+            (destination_longitude, destination_latitude),
+            radius,
+            top_k,
+            departure_time,
+            time_weight,
+        )
+        rows = await session.exec(
+            select(Travel, User)
+            .join(User, Travel.id_driver == User.id)
+            .where(Travel.id.in_([travel_id for travel_id, _ in ranked]))
+        )
+        found = {travel.id: (travel, user) for travel, user in rows}
+        ranked = [(travel_id, score) for travel_id, score in ranked if travel_id in found]
+        return search_page(
+            [found[travel_id] for travel_id, _ in ranked],
+            if_none_match,
+            scores=[score for _, score in ranked],
+        )
+
+    # Rows inside the boxes but outside the circles are dropped after the
+    # fetch, so keep reading batches until the page is full.
+    matched = []
+    next_cursor = None
+    while True:
+        rows = (await session.exec(keyset_page(stmt, Travel, cursor, limit))).all()
+
+        for index in match_travels(
+            rows,
+            (origin_longitude, origin_latitude),
+            (destination_longitude, destination_latitude),
+            radius,
         ):
-            travel_data = travel.model_dump()  # your Travel data as dict
-            travel_data["driver_name"] = user.name
-            travel_data["driver_phone"] = user.phone
-            filtered_results.append(travel_data)
+            matched.append(rows[index])
+            if len(matched) == limit:
+                travel = rows[index][0]
+                next_cursor = encode_cursor(travel.created_at, travel.id)
+                break
+
+        if next_cursor or len(rows) < limit:
+            break
+        cursor = encode_cursor(rows[-1][0].created_at, rows[-1][0].id)
 
-    return filtered_results
+    return search_page(matched, if_none_match, next_cursor)
 
 
-@router.get("/{travel_id}")
-def get_travel(travel_id: str, session: Session = Depends(get_session)):
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def stream_travels(
+    origin_latitude: float,
+    origin_longitude: float,
+    destination_latitude: float,
+    destination_longitude: float,
+    radius: int,
+    departure_after: Optional[UTCDatetime] = Query(None),
+    departure_before: Optional[UTCDatetime] = Query(None),
+    travel_status: Optional[str] = Query(None, alias="status"),
+    min_seats: int = Query(1, ge=0),
+):
+    """Stream every matching travel as newline-delimited JSON, one object per line."""
+    stmt = search_statement(
+        origin_latitude,
+        origin_longitude,
+        destination_latitude,
+        destination_longitude,
+        radius,
+        departure_after,
+        departure_before,
+        travel_status,
+        min_seats,
+    )
 
-    travel = session.exec(select(Travel).where(Travel.id == travel_id)).first()
+    async def generate():
+        if stmt is None:
+            return
 
-    if not travel:
-        raise HTTPException(status_code=404, detail="Travel not found")
+        # The request's session is closed before the body is sent, so the
+        # stream owns its session and server-side cursor.
+        async with AsyncSession(async_engine) as session:
+            result = await session.stream(
+                stmt.order_by(Travel.created_at.desc(), Travel.id.desc()).execution_options(
+                    yield_per=STREAM_BATCH_SIZE
+                )
+            )
+            async for rows in result.partitions():
+                chunk = []
+                for index in match_travels(
+                    rows,
+                    (origin_longitude, origin_latitude),
+                    (destination_longitude, destination_latitude),
+                    radius,
+                ):
+                    travel, user = rows[index]
+                    chunk.append(search_item(travel, user).model_dump_json())
+                if chunk:
+                    yield "\n".join(chunk) + "\n"
 
-    return travel
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
-@router.patch("/{travel_id}")
-def update_travel(travel_id: str, data: TravelPatch, session: Session = Depends(get_session)):
+@router.get("/match", response_model=Page[TravelMatchResult])
+async def match_routes(
+    pickup_latitude: float,
+    pickup_longitude: float,
+    dropoff_latitude: float,
+    dropoff_longitude: float,
+    radius: int = Query(..., ge=1, le=ROUTE_MATCH_MAX_RADIUS),
+    departure_after: Optional[UTCDatetime] = Query(None),
+    departure_before: Optional[UTCDatetime] = Query(None),
+    travel_status: Optional[str] = Query(None, alias="status"),
+    min_seats: int = Query(1, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Travels whose route passes within radius of the pickup and then the
+    drop-off, smallest detour first.
+    """
+    if not route_matcher.ready:
+        # Needs TRAVEL_INDEX_ENABLED, or the index is still being built
+        raise HTTPException(status_code=503, detail="Route matching is not available")
 
-    travel = session.exec(select(Travel).where(Travel.id == travel_id)).first()
+    # CPU-bound and holds the matcher's lock, so kept off the event loop
+    matches = await run_in_threadpool(
+        route_matcher.match,
+        (pickup_latitude, pickup_longitude),
+        (dropoff_latitude, dropoff_longitude),
+        radius,
+    )
 
-    if not travel:
+    # Matches are ranked in memory; rows are loaded, and filtered, a few
+    # pages' worth at a time until the page is full.
+    matched = []
+    for offset in range(0, len(matches), limit * MATCH_BATCH_PAGES):
+        batch = matches[offset : offset + limit * MATCH_BATCH_PAGES]
+        stmt = filter_statement(
+            select(Travel, User)
+            .join(User, Travel.id_driver == User.id)
+            .where(Travel.id.in_([match.travel_id for match in batch])),
+            departure_after,
+            departure_before,
+            travel_status,
+            min_seats,
+        )
+        found = {travel.id: (travel, user) for travel, user in await session.exec(stmt)}
+        matched.extend(
+            (*found[match.travel_id], match) for match in batch if match.travel_id in found
+        )
+        if len(matched) >= limit:
+            break
+    matched = matched[:limit]
+
+    etag = search_etag([(travel, user) for travel, user, _ in matched])
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    items = []
+    for travel, user, match in matched:
+        item = TravelMatchResult.model_validate(
+            search_item(travel, user, match.detour), from_attributes=True
+        )
+        item.pickup_distance = match.pickup_distance
+        item.dropoff_distance = match.dropoff_distance
+        items.append(item)
+
+    return ModelResponse(Page[TravelMatchResult](items=items), headers={"ETag": etag})
+
+
+@router.get("/{travel_id}", response_model=TravelResponse)
+async def get_travel(
+    travel_id: str,
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_session),
+):
+
+    async def load():
+        travel = (await session.exec(select(Travel).where(Travel.id == travel_id))).first()
+        if travel:
+            body = TravelResponse.model_validate(travel).model_dump_json().encode()
+            return pack_entity(entity_etag(travel.id, travel.updated_at), body)
+
+    entry = await entity_cache.get_or_load(travel_key(travel_id), load)
+
+    if entry is None:
         raise HTTPException(status_code=404, detail="Travel not found")
 
+    etag, body = unpack_entity(entry)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return ModelResponse(body, headers={"ETag": etag})
+
+
+@router.patch("/{travel_id}", response_model=TravelResponse)
+async def update_travel(
+    travel_id: str,
+    data: TravelPatch,
+    if_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Patch a travel with a single UPDATE ... RETURNING. An If-Match header
+    adds a locking read first, since the ETag is checked against the
+    current row. A new origin or destination without the other adds an
+    UPDATE of the route, which needs both.
+    """
     travel_data = data.model_dump(exclude_unset=True)
+    travel_data.update(coordinate_fields(travel_data))
+    rerouted = bool({"route", "origin", "destination"} & travel_data.keys())
+    route = travel_data.pop("route", None)
+
+    previous_origin = None
+    if if_match is not None:
+        # Hold the row until commit so nobody changes it between the check and the write
+        current = (
+            await session.exec(
+                select(Travel.updated_at, Travel.origin)
+                .where(Travel.id == travel_id)
+                .with_for_update()
+            )
+        ).first()
+        if not current:
+            raise HTTPException(status_code=404, detail="Travel not found")
+        check_if_match(if_match, entity_etag(travel_id, current.updated_at))
+        previous_origin = current.origin
+
+    if rerouted and "origin" in travel_data and "destination" in travel_data:
+        travel_data["route"] = route_field(travel_data["origin"], travel_data["destination"], route)
+    travel_data["updated_at"] = datetime.now()
 
-    for key, value in travel_data.items():
-        setattr(travel, key, value)
+    stmt = update(Travel).where(Travel.id == travel_id).values(travel_data)
+    columns = [Travel]
+    if previous_origin is None and "origin" in travel_data:
+        # Searches around the origin being replaced change too; read it in the same statement
+        previous = (
+            select(Travel.id, Travel.origin)
+            .where(Travel.id == travel_id)
+            .with_for_update()
+            .subquery()
+        )
+        stmt = stmt.where(Travel.id == previous.c.id)
+        columns.append(previous.c.origin)
+    stmt = stmt.returning(*columns).execution_options(synchronize_session=False)
+    row = (await session.exec(stmt)).first()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Travel not found")
 
-    session.add(travel)
-    session.commit()
-    session.refresh(travel)
+    travel = row[0]
+    if len(row) > 1:
+        previous_origin = row[1]
+    if rerouted and "route" not in travel_data:
+        routes = {travel_id: {"route": route_field(travel.origin, travel.destination, route)}}
+        travel = (await session.exec(bulk_update_statement(("route",), routes))).scalar_one()
+    if "start_time" in travel_data or "days_of_week" in travel_data:
+        await sync_occurrences(session, [(travel.id, travel.start_time, travel.days_of_week)])
+    await session.commit()
+    travel_index.update(travel.id, travel_data.get("origin"), travel_data.get("destination"))
+    if rerouted and route_matcher.ready:
+        await run_in_threadpool(route_matcher.add, travel.id, travel_route(**route_columns(travel)))
+    await search_cache.invalidate(previous_origin or travel.origin, travel.origin)
+    await entity_cache.invalidate(travel_key(travel_id))
 
-    return travel
+    return ModelResponse(
+        TravelResponse.model_validate(travel),
+        headers={"ETag": entity_etag(travel.id, travel.updated_at)},
+    )
 
 
 @router.delete("/{travel_id}")
-def delete_travel(travel_id: str, session: Session = Depends(get_session)):
+async def delete_travel(travel_id: str, session: AsyncSession = Depends(get_async_session)):
 
-    travel = session.exec(select(Travel).where(Travel.id == travel_id)).first()
+    # Occurrences go with the travel through their ON DELETE CASCADE
+    stmt = delete(Travel).where(Travel.id == travel_id).returning(Travel.id, Travel.origin)
+    travel = (await session.exec(stmt)).first()
 
     if not travel:
         raise HTTPException(status_code=404, detail="Travel not found")
 
-    session.delete(travel)
-    session.commit()
+    await session.commit()
+    travel_index.remove(travel_id)
+    if route_matcher.ready:
+        await run_in_threadpool(route_matcher.remove, travel_id)
+    await search_cache.invalidate(travel.origin)
+    await entity_cache.invalidate(travel_key(travel_id))
 
     return {"message": "Travel deleted successfully"}
+
+
+@router.post("/{travel_id}/book", response_model=TravelResponse)
+async def book_travel(
+    travel_id: str,
+    seats: int = Query(1, ge=1),
+    session: AsyncSession = Depends(get_async_session),
+):
+    # A single conditional UPDATE: the row lock is held only for the
+    # statement, and concurrent bookings can never oversell the ride.
+    remaining = Travel.available_seats - seats
+    stmt = (
+        update(Travel)
+        .where(Travel.id == travel_id, Travel.available_seats >= seats)
+        .values(
+            available_seats=remaining,
+            status=case((remaining == 0, FULL_STATUS), else_=Travel.status),
+            updated_at=datetime.now(),
+        )
+        .returning(Travel)
+        .execution_options(synchronize_session=False)
+    )
+    travel = (await session.exec(stmt)).scalar_one_or_none()
+
+    if travel is None:
+        await session.rollback()
+        exists = (await session.exec(select(Travel.id).where(Travel.id == travel_id))).first()
+        if not exists:
+            raise HTTPException(status_code=404, detail="Travel not found")
+        raise HTTPException(status_code=409, detail="Not enough seats available")
+
+    await session.commit()
+    await search_cache.invalidate(travel.origin)
+    await entity_cache.invalidate(travel_key(travel_id))
+
+    return ModelResponse(TravelResponse.model_validate(travel))
@@ -1,28 +1,42 @@
 from datetime import datetime
+from typing import Optional
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, Body
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, UploadFile, Body
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.database import get_session
+from app.database import get_async_session, is_foreign_key_violation
+from app.models.travel import Travel
 from app.models.user import User
 from app.types.auth import JWTAuthCredentials
+from app.types.pagination import Page
 from app.types.user import UserCreate, UserPatch, UserResponse
 from app.utils.auth_utils import auth_bearer, create_user_cognito
+from app.utils.aws_utils import run_aws_call
+from app.utils.cache_utils import entity_cache, pack_entity, unpack_entity, user_key
+from app.utils.etags import check_if_match, collection_etag, entity_etag, etag_matches, not_modified
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, keyset_page
+from app.utils.responses import ModelResponse
+from app.utils.search_cache import search_cache
 from app.utils.utils import delete_user_photo, format_phone_number, upload_user_photo
 
 router = APIRouter()
 
 
-@router.post("/")
+@router.post("/", response_model=UserResponse)
 async def create_user(
     user: UserCreate = Body(...),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
 
     try:
 
-        response_exist_user = session.query(User).filter(User.email == user.email).first()
+        response_exist_user = (
+            await session.exec(select(User).where(User.email == user.email))
+        ).first()
 
         if response_exist_user is not None:
             raise HTTPException(status_code=409, detail="Usuário já existe")
@@ -39,89 +53,157 @@ async def create_user(
 
         new_user = User(**user.model_dump(), photo=None, id=user_id, score=5.0)
 
-        username = create_user_cognito(user)
+        await run_aws_call("cognito-idp", create_user_cognito, user)
 
         session.add(new_user)
-        session.commit()
-        session.refresh(new_user)
+        await session.commit()
 
     except Exception as error:
         print(error)
         raise HTTPException(status_code=500, detail="Internal server error.")
 
-    return UserResponse(**new_user.model_dump(), username=username)
+    return ModelResponse(UserResponse.model_validate(new_user))
 
 
-@router.get("/", response_model=list[UserResponse])
-def list_users(
+@router.get("/", response_model=Page[UserResponse])
+async def list_users(
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
     claims: JWTAuthCredentials = Depends(auth_bearer),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    users = session.exec(select(User)).all()
-    return [
-        UserResponse(**user.model_dump(), username=user.email.lower().split("@")[0])
-        for user in users
-    ]
+    # One extra row tells us whether there is a next page
+    users = (await session.exec(keyset_page(select(User), User, cursor, limit + 1))).all()
 
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
 
-@router.get("/{user_id}")
-def get_user(
+    etag = collection_etag([(user.id, user.updated_at) for user in users], next_cursor)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return ModelResponse(
+        Page[UserResponse](
+            items=[UserResponse.model_validate(user) for user in users],
+            next_cursor=next_cursor,
+        ),
+        headers={"ETag": etag},
+    )
+
+
+@router.get("/{user_id}", response_model=UserResponse)
+async def get_user(
     user_id: str,
+    if_none_match: Optional[str] = Header(None),
     claims: JWTAuthCredentials = Depends(auth_bearer),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
 
-    user = session.exec(select(User).where(User.id == user_id)).first()
+    async def load():
+        user = (await session.exec(select(User).where(User.id == user_id))).first()
+        if user:
+            body = UserResponse.model_validate(user).model_dump_json().encode()
+            return pack_entity(entity_etag(user.id, user.updated_at), body)
 
-    if not user:
-        return HTTPException(status_code=404, detail="User not found")
+    entry = await entity_cache.get_or_load(user_key(user_id), load)
+
+    if entry is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    etag, body = unpack_entity(entry)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
 
-    return user
+    return ModelResponse(body, headers={"ETag": etag})
 
 
-@router.patch("/{user_id}")
+@router.patch("/{user_id}", response_model=UserResponse)
 async def update_user(
     user_id: str,
     data: UserPatch = Depends(UserPatch.as_form),
     file: UploadFile = File(None),
+    if_match: Optional[str] = Header(None),
     claims: JWTAuthCredentials = Depends(auth_bearer),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    user = session.exec(select(User).where(User.id == user_id)).first()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    if if_match is not None or file is not None:
+        # Not locked: the UPDATE below re-checks updated_at instead, so the
+        # row is not held during the upload
+        current = (
+            await session.exec(select(User.id, User.updated_at).where(User.id == user_id))
+        ).first()
+        # Don't upload a photo for a user that does not exist
+        if not current:
+            raise HTTPException(status_code=404, detail="User not found")
+        check_if_match(if_match, entity_etag(user_id, current.updated_at))
 
     update_data = data.model_dump(exclude_unset=True)
 
-    for key, value in update_data.items():
-        setattr(user, key, value)
-
     if file is not None:
-        user.photo = upload_user_photo(user_id, file)
+        update_data["photo"] = await run_aws_call("s3", upload_user_photo, user_id, file)
+
+    update_data["updated_at"] = datetime.now()
+    stmt = update(User).where(User.id == user_id)
+    if if_match is not None:
+        stmt = stmt.where(User.updated_at == current.updated_at)
+    stmt = stmt.values(update_data).returning(User).execution_options(synchronize_session=False)
+    user = (await session.exec(stmt)).scalar_one_or_none()
+
+    if not user:
+        # Changed since the check above: the photo is stored under the user's
+        # key, so it stays in place for the row that points to it
+        if (
+            if_match is not None
+            and (await session.exec(select(User.id).where(User.id == user_id))).first()
+        ):
+            raise HTTPException(status_code=412, detail="Resource has been modified")
+        # Deleted since the check above
+        if file is not None:
+            await run_aws_call("s3", delete_user_photo, user_id)
+        raise HTTPException(status_code=404, detail="User not found")
 
-    user.updated_at = datetime.now()
-    session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await entity_cache.invalidate(user_key(user_id))
+    # Cached searches carry the driver's name, phone and updated_at
+    origins = (await session.exec(select(Travel.origin).where(Travel.id_driver == user_id))).all()
+    await search_cache.invalidate(*origins)
 
-    return user
+    return ModelResponse(
+        UserResponse.model_validate(user),
+        headers={"ETag": entity_etag(user.id, user.updated_at)},
+    )
 
 
 @router.delete("/{user_id}")
-def delete_user(
+async def delete_user(
     user_id: str,
     claims: JWTAuthCredentials = Depends(auth_bearer),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
 
-    user = session.exec(select(User).where(User.id == user_id)).first()
+    try:
+        stmt = delete(User).where(User.id == user_id).returning(User.id)
+        user = (await session.exec(stmt)).first()
+    except IntegrityError as error:
+        await session.rollback()
+        if not is_foreign_key_violation(error):
+            raise
+        raise HTTPException(status_code=409, detail="User still drives travels")
 
     if not user:
-        return HTTPException(status_code=404, detail="User not found")
+        raise HTTPException(status_code=404, detail="User not found")
+
+    await session.commit()
+    await entity_cache.invalidate(user_key(user_id))
 
-    delete_user_photo(user_id)
-    session.delete(user)
-    session.commit()
+    # Outside the transaction, like the upload in update_user; a failure only
+    # leaves an orphaned photo behind
+    try:
+        await run_aws_call("s3", delete_user_photo, user_id)
+    except Exception as error:
+        print(f"Could not delete the photo of user {user_id}: {error}")
 
     return {"message": "User deleted successfully"}
@@ -0,0 +1,16 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    """One page of a keyset-paginated listing."""
+
+    items: List[T]
+    next_cursor: Optional[str] = Field(
+        None,
+        title="Next Cursor",
+        description="Pass as `cursor` to fetch the next page; null on the last page",
+    )
@@ -1,7 +1,23 @@
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import Annotated, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Convert an aware datetime to naive UTC, as the timestamp columns store them."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def utc_now() -> datetime:
+    """The current time as naive UTC, comparable with start_time and departs_at."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# Accepts "2030-01-01T07:30:00Z" or "+03:00" offsets as well as naive times
+UTCDatetime = Annotated[datetime, AfterValidator(naive_utc)]
 
 
 class Location(BaseModel):
@@ -16,6 +32,9 @@ class Travel(BaseModel):
     id_driver: str = Field(..., title="Driver ID", description="Unique identifier for the driver")
     origin: Location = Field(..., title="Origin", description="Origin of the travel")
     destination: Location = Field(..., title="Destination", description="Destination of the travel")
+    route: Optional[List[Location]] = Field(
+        None, title="Route", description="Path driven between origin and destination"
+    )
     days_of_week: Optional[List[str]] = Field(
         None, title="Days of Week", description="Days of week when the travel repeats"
     )
@@ -29,7 +48,7 @@ class Travel(BaseModel):
     description: str = Field(
         None, title="Travel Description", description="Any more details of the travel"
     )
-    start_time: datetime = Field(..., title="Start Time", description="Time of departure")
+    start_time: UTCDatetime = Field(..., title="Start Time", description="Time of departure")
     created_at: datetime = Field(default_factory=datetime.now)
 
 
@@ -40,6 +59,9 @@ class TravelPatch(BaseModel):
     destination: Location = Field(
         None, title="Destination", description="Destination of the travel"
     )
+    route: Optional[List[Location]] = Field(
+        None, title="Route", description="Path driven between origin and destination"
+    )
     days_of_week: Optional[List[str]] = Field(
         None, title="Days of Week", description="Days of week when the travel repeats"
     )
@@ -50,7 +72,7 @@ class TravelPatch(BaseModel):
     status: str = Field(
         None, title="Travel Staus", description="Status of the travel(empty, full, etc)"
     )
-    start_time: datetime = Field(None, title="Start Time", description="Time of departure")
+    start_time: UTCDatetime = Field(None, title="Start Time", description="Time of departure")
     description: str = Field(
         None, title="Travel Description", description="Any more details of the travel"
     )
@@ -62,21 +84,25 @@ class TravelCreate(BaseModel):
     id_driver: str
     origin: Location
     destination: Location
+    route: Optional[List[Location]] = None
     days_of_week: Optional[List[str]]
     price: float
     available_seats: int = None
     status: str = None
-    start_time: datetime
+    start_time: UTCDatetime
     description: str = None
 
 
 class TravelResponse(BaseModel):
     """Response model for travel data."""
 
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     id_driver: str
     origin: Location
     destination: Location
+    route: Optional[List[Location]] = None
     days_of_week: Optional[List[str]]
     price: float
     available_seats: int = None
@@ -84,6 +110,57 @@ class TravelResponse(BaseModel):
     description: str = None
     start_time: datetime = None
     created_at: datetime = None
+    updated_at: datetime = None
+
+
+class TravelSearchResult(TravelResponse):
+    """Travel data plus the driver's contact, as listed by the search endpoints."""
+
+    driver_name: str = None
+    driver_phone: str = None
+    score: Optional[float] = Field(
+        None, description="Ranking score in top_k mode, lower is better (meters)"
+    )
+
+
+class TravelMatchResult(TravelSearchResult):
+    """Travel whose route passes near the passenger's stops; score is the detour in meters."""
+
+    pickup_distance: float = None
+    dropoff_distance: float = None
+
+
+MAX_BULK_ITEMS = 500
+
+
+class TravelBulkCreate(BaseModel):
+    """Model for creating many travels in one request."""
+
+    items: List[TravelCreate] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class TravelBulkPatchItem(TravelPatch):
+    """Patch for one travel of a bulk update."""
+
+    id: str = Field(..., title="Travel ID", description="Travel to update")
+
+
+class TravelBulkPatch(BaseModel):
+    """Model for patching many travels in one request."""
+
+    items: List[TravelBulkPatchItem] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class TravelBulkResult(BaseModel):
+    """Outcome of one item of a bulk request, in request order."""
+
+    index: int
+    status_code: int
+    travel: Optional[TravelResponse] = None
+    detail: Optional[str] = None
+
+
+class TravelBulkResponse(BaseModel):
+    """Response model for the bulk travel endpoints."""
 
-    def __init__(self, **data):
-        super().__init__(**data)
+    results: List[TravelBulkResult]
@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import File, Form, UploadFile
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, computed_field, field_validator
 
 
 class User(BaseModel):
@@ -49,8 +49,9 @@ class UserCreate(BaseModel):
 class UserResponse(BaseModel):
     """Response model for user data."""
 
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
-    username: str
     name: str
     email: str
     phone: str
@@ -60,7 +61,12 @@ class UserResponse(BaseModel):
     created_at: datetime = None
     updated_at: datetime = None
 
-    def __init__(self, **data):
-        if "photo" in data and data["photo"] is None:
-            data["photo"] = ""
-        super().__init__(**data)
+    @field_validator("photo", mode="before")
+    @classmethod
+    def empty_photo(cls, photo: Optional[str]) -> str:
+        return "" if photo is None else photo
+
+    @computed_field
+    @property
+    def username(self) -> str:
+        return self.email.lower().split("@")[0]
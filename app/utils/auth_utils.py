@@ -3,49 +3,134 @@ import hashlib
 import hmac
 import json
 import os
-from typing import Any, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
 
-import boto3
 import requests
-from botocore.exceptions import ClientError
 from fastapi import HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwk, jwt
 from jose.exceptions import JOSEError
 from jose.utils import base64url_decode
+from starlette.concurrency import run_in_threadpool
 
 from app.types.auth import JWKS, JWTAuthCredentials
 from app.types.user import UserCreate
+from app.utils.aws_utils import get_aws_client
 
 
 def get_auth_error_message() -> str:
     return "Autentication failed."
 
 
-def get_auth_secrets() -> Dict[str, str]:
+AUTH_SECRETS_TTL = float(os.getenv("AUTH_SECRETS_TTL", "300"))
+AUTH_SECRETS_STALE_TTL = float(os.getenv("AUTH_SECRETS_STALE_TTL", "3600"))
+AUTH_SECRETS_RETRY_INTERVAL = float(os.getenv("AUTH_SECRETS_RETRY_INTERVAL", "30"))
+
+
+class SecretCache:
+    """
+    Process-wide TTL cache with stale-while-revalidate semantics.
+
+    A value younger than `refresh_after` is returned as is. Between
+    `refresh_after` and `ttl + stale_ttl` the cached value is still returned
+    and a single background thread reloads it, at most once every
+    `retry_interval` seconds so an outage does not cost a call per request.
+    Only a cold cache, or one older than `ttl + stale_ttl`, makes the caller
+    wait for the loader.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Dict[str, str]],
+        ttl: float = AUTH_SECRETS_TTL,
+        stale_ttl: float = AUTH_SECRETS_STALE_TTL,
+        retry_interval: float = AUTH_SECRETS_RETRY_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_after = ttl * 0.8
+        self.retry_interval = retry_interval
+        self.clock = clock
+        self._value: Optional[Dict[str, str]] = None
+        self._loaded_at = 0.0
+        # When the last background refresh started, successful or not
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def get(self) -> Dict[str, str]:
+        value = self._value
+        age = self.clock() - self._loaded_at
+
+        if value is not None and age < self.ttl + self.stale_ttl:
+            if age >= self.refresh_after:
+                self.refresh_in_background()
+            return value
+
+        with self._lock:
+            # Another caller may have loaded it while we waited
+            if self._value is not None and self.clock() - self._loaded_at < self.ttl:
+                return self._value
+            return self._load()
+
+    def refresh_in_background(self):
+        with self._refresh_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            now = self.clock()
+            if self._refreshed_at is not None and now - self._refreshed_at < self.retry_interval:
+                return
+            self._refreshed_at = now
+            self._refresh_thread = threading.Thread(target=self._refresh, daemon=True)
+            self._refresh_thread.start()
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+    def _refresh(self):
+        try:
+            with self._lock:
+                self._load()
+        except Exception as error:
+            # Keep serving the stale value until the next attempt
+            print(error)
+
+    def _load(self) -> Dict[str, str]:
+        value = self.loader()
+        self._value = value
+        self._loaded_at = self.clock()
+        return value
+
+
+def fetch_auth_secrets(client=None) -> Dict[str, str]:
     secret_name = os.getenv("AWS_COGNITO_SECRET_NAME")
-    region_name = os.getenv("AWS_DEFAULT_REGION")
 
-    # Create a Secrets Manager client
-    session = boto3.session.Session()
-    client = session.client(
-        service_name="secretsmanager",
-        region_name=region_name,
+    if client is None:
+        client = get_aws_client("secretsmanager")
+
+    get_secret_value_response = client.get_secret_value(
+        SecretId=secret_name,
     )
 
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name,
-        )
+    return json.loads(get_secret_value_response["SecretString"])
 
-    except ClientError as e:
-        raise e
 
-    return json.loads(get_secret_value_response["SecretString"])
+auth_secrets_cache = SecretCache(fetch_auth_secrets)
+
+
+def get_auth_secrets() -> Dict[str, str]:
+    return auth_secrets_cache.get()
 
 
 def create_user_cognito(user: UserCreate) -> str:
-    cognito_client = boto3.client("cognito-idp")
+    cognito_client = get_aws_client("cognito-idp")
     try:
         username = user.email.lower().split("@")[0]
         secret_hash = calc_secret(username=username)
@@ -106,6 +191,77 @@ def get_jwks():
     return response.json()
 
 
+JWKS_TTL = float(os.getenv("JWKS_TTL", "3600"))
+JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("JWKS_MIN_REFRESH_INTERVAL", "30"))
+
+
+class JWKSCache:
+    """
+    Constructed JWKS public keys indexed by `kid`.
+
+    Keys are reloaded when the TTL expires, or when a token carries an
+    unknown `kid`. Either way the endpoint is called at most once every
+    `min_refresh_interval` seconds, failed calls included, so forged kids
+    or a JWKS outage cannot hammer it.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Dict[str, Any]] = get_jwks,
+        ttl: float = JWKS_TTL,
+        min_refresh_interval: float = JWKS_MIN_REFRESH_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.loader = loader
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.clock = clock
+        self._keys: Dict[str, Any] = {}
+        # Age of the keys, for the TTL
+        self._loaded_at: Optional[float] = None
+        # Last call to the endpoint, successful or not, for the rate limit
+        self._attempted_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _may_refresh(self, now: float) -> bool:
+        return self._attempted_at is None or now - self._attempted_at >= self.min_refresh_interval
+
+    def get_key(self, kid: str):
+        if self._loaded_at is None or self.clock() - self._loaded_at >= self.ttl:
+            self._refresh(expired=True)
+
+        key = self._keys.get(kid)
+        if key is None and self._may_refresh(self.clock()):
+            self._refresh(expired=False)
+            key = self._keys.get(kid)
+
+        return key
+
+    def _refresh(self, expired: bool):
+        with self._lock:
+            now = self.clock()
+            # Another request refreshed while we waited for the lock
+            if expired and self._loaded_at is not None and now - self._loaded_at < self.ttl:
+                return
+            if not self._may_refresh(now):
+                return
+
+            self._attempted_at = now
+            try:
+                jwks = JWKS.model_validate(self.loader())
+            except HTTPException:
+                if not self._keys:
+                    raise
+                # Keep verifying with the known keys until the next attempt
+                return
+
+            self._keys = {key["kid"]: jwk.construct(key) for key in jwks.keys}
+            self._loaded_at = now
+
+
+jwks_cache = JWKSCache()
+
+
 def get_public_key(token: str, jwks: JWKS) -> Optional[Dict[str, str]]:
     try:
         headers = jwt.get_unverified_header(token)
@@ -148,23 +304,69 @@ def verify_jwt(token: str, jwks: Dict[str, Any]):
     return pub_key.verify(message.encode(), decoded_signature)
 
 
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified credentials keyed by the token's SHA-256.
+
+    Entries are dropped once the token's `exp` claim has passed, so a cache
+    hit never extends a token's lifetime.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, clock: Callable[[], float] = time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[JWTAuthCredentials, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[JWTAuthCredentials]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, credentials: JWTAuthCredentials, expires_at: float):
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (credentials, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
 class AuthBearer(HTTPBearer):
-    def __init__(self, auto_error: bool = True):
+    def __init__(self, auto_error: bool = True, token_cache: Optional[TokenCache] = None):
         super().__init__(auto_error=auto_error)
+        self.token_cache = token_cache if token_cache is not None else TokenCache()
 
     def verify_token(self, jwt_credentials: JWTAuthCredentials) -> bool:
-        try:
-            jwks = JWKS.model_validate(get_jwks())
-            kid_to_jwk = {jwk["kid"]: jwk for jwk in jwks.keys}
-            public_key = kid_to_jwk[jwt_credentials.header["kid"]]
-        except KeyError as error:
-            print(error)
+        key = jwks_cache.get_key(jwt_credentials.header.get("kid"))
+        if key is None:
             raise HTTPException(
                 status_code=403,
                 detail=get_auth_error_message(),
             )
 
-        key = jwk.construct(public_key)
         decoded_signature = base64url_decode(jwt_credentials.sig.encode())
 
         return key.verify(jwt_credentials.message.encode(), decoded_signature)
@@ -182,6 +384,10 @@ class AuthBearer(HTTPBearer):
                 )
 
             jwt_token = credentials.credentials
+            cached_credentials = self.token_cache.get(jwt_token)
+            if cached_credentials is not None:
+                return cached_credentials
+
             message, signature = jwt_token.rsplit(".", 1)
 
             try:
@@ -199,12 +405,21 @@ class AuthBearer(HTTPBearer):
                     detail=get_auth_error_message(),
                 )
 
-            if not self.verify_token(jwt_credentials=jwt_credentials):
+            expires_at = jwt_credentials.claims.get("exp")
+            if not isinstance(expires_at, (int, float)) or expires_at <= time.time():
+                raise HTTPException(
+                    status_code=403,
+                    detail=get_auth_error_message(),
+                )
+
+            # A cold or expired JWKS cache does network I/O, keep it off the event loop
+            if not await run_in_threadpool(self.verify_token, jwt_credentials=jwt_credentials):
                 raise HTTPException(
                     status_code=403,
                     detail=get_auth_error_message(),
                 )
 
+            self.token_cache.put(jwt_token, jwt_credentials, expires_at)
             return jwt_credentials
 
 
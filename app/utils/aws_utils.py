@@ -0,0 +1,187 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional, TypeVar
+
+import boto3
+from botocore.config import Config
+from fastapi import HTTPException
+
+from app.metrics import (
+    AWS_CALL_DURATION,
+    AWS_CALL_FAILURES,
+    AWS_EXECUTOR_IN_FLIGHT,
+    AWS_EXECUTOR_QUEUE_DEPTH,
+)
+
+T = TypeVar("T")
+
+AWS_EXECUTOR_MAX_WORKERS = int(os.getenv("AWS_EXECUTOR_MAX_WORKERS", "8"))
+AWS_EXECUTOR_MAX_QUEUE = int(os.getenv("AWS_EXECUTOR_MAX_QUEUE", "64"))
+AWS_CALL_TIMEOUT = float(os.getenv("AWS_CALL_TIMEOUT", "10"))
+AWS_MAX_POOL_CONNECTIONS = int(
+    os.getenv("AWS_MAX_POOL_CONNECTIONS", str(max(AWS_EXECUTOR_MAX_WORKERS, 10)))
+)
+AWS_TCP_KEEPALIVE = os.getenv("AWS_TCP_KEEPALIVE", "true").lower() == "true"
+AWS_RETRY_MODE = os.getenv("AWS_RETRY_MODE", "standard")
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "3"))
+AWS_SERVICES = ("cognito-idp", "s3", "secretsmanager")
+
+
+class BoundedExecutor:
+    """
+    Thread pool for blocking calls to a single upstream service.
+
+    Each service gets its own pool, so a slow upstream can only exhaust its
+    own threads. Calls beyond `max_queue` waiting callers are rejected with a
+    503 instead of piling up, and callers give up after `timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        max_workers: int = AWS_EXECUTOR_MAX_WORKERS,
+        max_queue: int = AWS_EXECUTOR_MAX_QUEUE,
+        timeout: float = AWS_CALL_TIMEOUT,
+    ):
+        self.service = service
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"aws-{service}"
+        )
+
+    def _set_pending(self, delta: int):
+        with self._lock:
+            self.pending += delta
+            AWS_EXECUTOR_QUEUE_DEPTH.labels(service=self.service).set(self.pending)
+
+    def _run(self, fn: Callable[[], T]) -> T:
+        self._set_pending(-1)
+        in_flight = AWS_EXECUTOR_IN_FLIGHT.labels(service=self.service)
+        in_flight.inc()
+        try:
+            return fn()
+        finally:
+            in_flight.dec()
+
+    async def run(
+        self, fn: Callable[..., T], *args, timeout: Optional[float] = None, **kwargs
+    ) -> T:
+        with self._lock:
+            if self.pending >= self.max_queue:
+                AWS_CALL_FAILURES.labels(service=self.service, reason="rejected").inc()
+                raise HTTPException(
+                    status_code=503, detail=f"{self.service} is overloaded, try again later"
+                )
+            self.pending += 1
+            AWS_EXECUTOR_QUEUE_DEPTH.labels(service=self.service).set(self.pending)
+
+        start = time.perf_counter()
+        future = self._executor.submit(self._run, partial(fn, *args, **kwargs))
+        # A call cancelled before it started never reaches _run
+        future.add_done_callback(lambda done: done.cancelled() and self._set_pending(-1))
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            AWS_CALL_FAILURES.labels(service=self.service, reason="timeout").inc()
+            raise HTTPException(status_code=504, detail=f"{self.service} timed out")
+        finally:
+            AWS_CALL_DURATION.labels(service=self.service).observe(time.perf_counter() - start)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AWSClients:
+    """
+    Registry of long-lived boto3 clients, one per service.
+
+    boto3 clients are thread-safe once built, but building them from a shared
+    session is not, so creation happens under a lock. Every client shares the
+    same botocore config (connection pool size, keep-alive and retry mode).
+    """
+
+    def __init__(self, config: Optional[Config] = None):
+        self.config = config or Config(
+            max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+            tcp_keepalive=AWS_TCP_KEEPALIVE,
+            retries={"mode": AWS_RETRY_MODE, "max_attempts": AWS_MAX_ATTEMPTS},
+        )
+        self._session: Optional[boto3.session.Session] = None
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, service: str):
+        client = self._clients.get(service)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(service)
+            if client is None:
+                if self._session is None:
+                    self._session = boto3.session.Session()
+                client = self._session.client(service, config=self.config)
+                self._clients[service] = client
+        return client
+
+    def start(self, services: Iterable[str] = AWS_SERVICES):
+        for service in services:
+            try:
+                self.get(service)
+            except Exception as error:
+                # e.g. no region configured locally; retried on first use
+                print(f"Could not create {service} client: {error}")
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+            self._session = None
+
+
+aws_clients = AWSClients()
+
+
+def get_aws_client(service: str):
+    return aws_clients.get(service)
+
+
+aws_executors: Dict[str, BoundedExecutor] = {}
+
+
+def get_aws_executor(service: str) -> BoundedExecutor:
+    executor = aws_executors.get(service)
+    if executor is None:
+        executor = aws_executors.setdefault(service, BoundedExecutor(service))
+    return executor
+
+
+async def run_aws_call(service: str, fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a blocking boto3 call on the service's bounded executor.
+
+    Parameters:
+        service: name of the upstream, e.g. "cognito-idp" or "s3"
+        fn: blocking callable to run
+        *args, **kwargs: forwarded to fn; `timeout` overrides AWS_CALL_TIMEOUT
+
+    Returns:
+        The callable's return value
+    """
+    return await get_aws_executor(service).run(fn, *args, **kwargs)
+
+
+def shutdown_aws_executors():
+    for executor in aws_executors.values():
+        executor.shutdown()
+    aws_executors.clear()
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class CacheBackend(ABC):
+    """Byte-oriented key/value store with per-entry TTLs."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float): ...
+
+    @abstractmethod
+    async def delete(self, *keys: str): ...
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Increment a counter that never expires and return its new value."""
+
+    @abstractmethod
+    async def counters(self, *keys: str) -> List[int]:
+        """Read counters, 0 for the ones never incremented."""
+
+    async def close(self):
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU, local to the worker."""
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        # Kept apart from the LRU: an evicted counter would restart from 0
+        self._counters: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._entries[key] = (value, self.clock() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def counters(self, *keys: str) -> List[int]:
+        return [self._counters.get(key, 0) for key in keys]
+
+
+class RedisCacheBackend(CacheBackend):
+    """Shared cache on any Redis-compatible server (needs the `redis` package)."""
+
+    def __init__(self, url: str = REDIS_URL):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the `redis` package")
+
+        self.client = redis.Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.set(key, value, px=int(ttl * 1000))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*keys)
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+
+    async def counters(self, *keys: str) -> List[int]:
+        if not keys:
+            return []
+        return [int(value or 0) for value in await self.client.mget(keys)]
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_cache_backend(
+    name: str = CACHE_BACKEND, max_entries: int = CACHE_MAX_ENTRIES
+) -> CacheBackend:
+    if name == "redis":
+        return RedisCacheBackend()
+    if name == "memory":
+        return MemoryCacheBackend(max_entries)
+    raise ValueError(f"Unknown CACHE_BACKEND: {name}")
+
+
+class ReadThroughCache:
+    """
+    Read-through cache with single-flight loading.
+
+    Concurrent misses on the same key share one loader call. Invalidating a
+    key detaches its running load: misses after the invalidation start a
+    fresh one, and the detached load's value is not written back, so a
+    write that commits mid-load is neither hidden nor overwritten by the
+    stale read.
+
+    That guarantee only covers invalidations made through this instance,
+    i.e. in the same worker. With a shared backend, a load in one worker can
+    still write back a value read before another worker's write; it is then
+    served until its TTL runs out.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get_or_load(
+        self, key: str, loader: Callable[[], Awaitable[Optional[bytes]]]
+    ) -> Optional[bytes]:
+        """
+        Return the cached value for key, calling loader on a miss.
+
+        Parameters:
+            key: cache key
+            loader: coroutine function returning the value, or None if the
+                entity does not exist (None is not cached)
+
+        Returns:
+            The cached or freshly loaded bytes, or None
+        """
+        value = await self.backend.get(key)
+        if value is not None:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+            # Unless invalidate() detached this load while it ran
+            if value is not None and self._inflight.get(key) is future:
+                await self.backend.set(key, value, self.ttl)
+            future.set_result(value)
+            return value
+        except BaseException as error:
+            future.set_exception(error)
+            # Waiters get the error; don't warn about it being unretrieved
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def invalidate(self, *keys: str):
+        for key in keys:
+            # Its waiters still get the old value; later misses load again
+            self._inflight.pop(key, None)
+        await self.backend.delete(*keys)
+
+    async def close(self):
+        await self.backend.close()
+
+
+def pack_entity(etag: str, body: bytes) -> bytes:
+    """Store an entity's ETag in front of its body so a hit can answer 304 directly."""
+    return etag.encode() + b"\n" + body
+
+
+def unpack_entity(value: bytes) -> Tuple[str, bytes]:
+    etag, _, body = value.partition(b"\n")
+    return etag.decode(), body
+
+
+def travel_key(travel_id: str) -> str:
+    return f"travel:{travel_id}"
+
+
+def user_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+entity_cache = ReadThroughCache(create_cache_backend())
@@ -0,0 +1,83 @@
+import hashlib
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+Version = Tuple[str, Optional[datetime]]
+
+
+def _digest(parts: Iterable[str]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def _version(item_id: str, updated_at: Optional[datetime]) -> str:
+    return f"{item_id}@{updated_at.isoformat() if updated_at else ''}"
+
+
+def entity_etag(item_id: str, updated_at: Optional[datetime]) -> str:
+    """
+    Strong ETag for a single row, derived from its id and row version.
+
+    Parameters:
+        item_id: primary key of the row
+        updated_at: last modification time of the row
+
+    Returns:
+        Quoted ETag value
+    """
+    return _digest([_version(item_id, updated_at)])
+
+
+def collection_etag(versions: Iterable[Version], next_cursor: Optional[str] = None) -> str:
+    """
+    Strong ETag for a page, changing whenever any row on it changes,
+    the page gains or loses a row, or the next cursor moves.
+
+    Parameters:
+        versions: (id, updated_at) pairs of the rows on the page, in order
+        next_cursor: the page's next_cursor
+
+    Returns:
+        Quoted ETag value
+    """
+    parts = [_version(item_id, updated_at) for item_id, updated_at in versions]
+    parts.append(next_cursor or "")
+    return _digest(parts)
+
+
+def _tags(header: str):
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """
+    Check an If-None-Match (weak comparison) or If-Match (strong
+    comparison) header against an ETag.
+    """
+    if not header:
+        return False
+    for tag in _tags(header):
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            if weak and tag[2:] == etag:
+                return True
+        elif tag == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def check_if_match(header: Optional[str], etag: str):
+    """Raise 412 when an If-Match header is present and does not match the current ETag."""
+    if header is not None and not etag_matches(header, etag, weak=False):
+        raise HTTPException(status_code=412, detail="Resource has been modified")
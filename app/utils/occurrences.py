@@ -0,0 +1,207 @@
+import os
+import unicodedata
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.travel import Travel, TravelOccurrence
+from app.types.travel import utc_now
+
+OCCURRENCE_WINDOW_DAYS = int(os.getenv("OCCURRENCE_WINDOW_DAYS", "28"))
+OCCURRENCE_REFRESH_SECONDS = float(os.getenv("OCCURRENCE_REFRESH_SECONDS", "3600"))
+
+# Rows per INSERT; two parameters each, well under Postgres' 32767 limit
+INSERT_BATCH_SIZE = 5000
+
+# Weekday numbers follow datetime.weekday(): Monday is 0, Sunday is 6
+WEEKDAY_NAMES = {
+    0: ("monday", "mon", "segunda", "seg"),
+    1: ("tuesday", "tue", "tues", "terca", "ter"),
+    2: ("wednesday", "wed", "quarta", "qua"),
+    3: ("thursday", "thu", "thur", "thurs", "quinta", "qui"),
+    4: ("friday", "fri", "sexta", "sex"),
+    5: ("saturday", "sat", "sabado", "sab"),
+    6: ("sunday", "sun", "domingo", "dom"),
+}
+WEEKDAYS = {name: weekday for weekday, names in WEEKDAY_NAMES.items() for name in names}
+
+TravelSchedule = Tuple[str, datetime, Optional[Sequence[str]]]
+
+
+def parse_weekday(value: str) -> Optional[int]:
+    """
+    Parse one days_of_week entry.
+
+    Accepts English and Portuguese names and abbreviations, with or without
+    accents and the "-feira" suffix, and numbers where 1-6 are Monday to
+    Saturday and both 0 and 7 are Sunday.
+
+    Returns:
+        Weekday number (Monday is 0), or None if the entry is not a day
+    """
+    name = unicodedata.normalize("NFKD", str(value).strip().lower())
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = name.rstrip(".").removesuffix("-feira").removesuffix(" feira").strip()
+
+    if name.isdigit():
+        number = int(name)
+        return (number - 1) % 7 if 0 <= number <= 7 else None
+    return WEEKDAYS.get(name)
+
+
+def parse_days_of_week(days: Optional[Iterable[str]]) -> Set[int]:
+    return {weekday for weekday in map(parse_weekday, days or []) if weekday is not None}
+
+
+def expand_occurrences(
+    start_time: datetime,
+    days_of_week: Optional[Iterable[str]],
+    window_start: datetime,
+    window_end: datetime,
+) -> List[datetime]:
+    """
+    Turn a travel's schedule into the departures inside a window.
+
+    A travel without recurring days departs once, at start_time. A recurring
+    travel departs at start_time's time of day on each of its days, starting
+    from start_time.
+
+    Parameters:
+        start_time: first departure
+        days_of_week: recurring days, in any format parse_weekday accepts
+        window_start: earliest departure to include
+        window_end: departures at or after this are left out
+
+    Returns:
+        Sorted list of departure datetimes
+    """
+    weekdays = parse_days_of_week(days_of_week)
+    if not weekdays:
+        return [start_time] if window_start <= start_time < window_end else []
+
+    first = max(start_time, window_start)
+    day: date = first.date()
+    departures = []
+    while True:
+        departure = datetime.combine(day, start_time.timetz())
+        if departure >= window_end:
+            return departures
+        if departure >= first and day.weekday() in weekdays:
+            departures.append(departure)
+        day += timedelta(days=1)
+
+
+def nearest_departure(
+    start_time: datetime, days_of_week: Optional[Iterable[str]], target: datetime
+) -> datetime:
+    """
+    The departure of a travel closest to target, for ranking by time.
+
+    Returns:
+        start_time for one-off travels, otherwise the closest recurring
+        departure not before start_time (start_time itself when target is
+        more than a week before it)
+    """
+    weekdays = parse_days_of_week(days_of_week)
+    if not weekdays:
+        return start_time
+
+    departures = [
+        datetime.combine(target.date() + timedelta(days=offset), start_time.timetz())
+        for offset in range(-7, 8)
+    ]
+    departures = [
+        departure
+        for departure in departures
+        if departure >= start_time and departure.weekday() in weekdays
+    ]
+    return min(departures, key=lambda departure: abs(departure - target), default=start_time)
+
+
+def departs_between(
+    start_time: datetime,
+    days_of_week: Optional[Iterable[str]],
+    after: datetime,
+    before: Optional[datetime] = None,
+) -> bool:
+    """
+    Whether a travel departs in [after, before), as the search's departure
+    filter on travel and travel_occurrence would find it.
+    """
+    if after <= start_time and (before is None or start_time < before):
+        return True
+    # Recurring travels depart at least once a week, and occurrences are
+    # only materialized inside the window
+    end = before or max(after, start_time) + timedelta(days=8)
+    end = min(end, utc_now() + timedelta(days=OCCURRENCE_WINDOW_DAYS))
+    return bool(expand_occurrences(start_time, days_of_week, after, end))
+
+
+def occurrence_rows(travels: Iterable[TravelSchedule], now: datetime) -> List[dict]:
+    window_end = now + timedelta(days=OCCURRENCE_WINDOW_DAYS)
+    return [
+        {"travel_id": travel_id, "departs_at": departs_at}
+        for travel_id, start_time, days_of_week in travels
+        for departs_at in expand_occurrences(start_time, days_of_week, now, window_end)
+    ]
+
+
+async def insert_occurrences(session: AsyncSession, rows: List[dict]):
+    for offset in range(0, len(rows), INSERT_BATCH_SIZE):
+        batch = rows[offset : offset + INSERT_BATCH_SIZE]
+        await session.exec(insert(TravelOccurrence).values(batch).on_conflict_do_nothing())
+
+
+async def sync_occurrences(session: AsyncSession, travels: Iterable[TravelSchedule]):
+    """
+    Replace the occurrences of the given travels inside the caller's
+    transaction. Call it before committing a write that creates a travel
+    or changes its start_time or days_of_week.
+
+    Parameters:
+        session: session holding the write
+        travels: (id, start_time, days_of_week) of each written travel
+    """
+    travels = list(travels)
+    if not travels:
+        return
+
+    travel_ids = [travel_id for travel_id, _, _ in travels]
+    await session.exec(delete(TravelOccurrence).where(TravelOccurrence.travel_id.in_(travel_ids)))
+    await insert_occurrences(session, occurrence_rows(travels, utc_now()))
+
+
+async def add_occurrences(session: AsyncSession, travels: Iterable[TravelSchedule]):
+    """
+    Like sync_occurrences, for travels that have no occurrences yet (new
+    ones), so there is nothing to delete first.
+    """
+    await insert_occurrences(session, occurrence_rows(travels, utc_now()))
+
+
+async def refresh_occurrences(session: AsyncSession, now: Optional[datetime] = None):
+    """
+    Roll the window forward: drop past departures and add the ones that
+    entered the window. Safe to run from several workers at once.
+    """
+    now = now or utc_now()
+    await session.exec(delete(TravelOccurrence).where(TravelOccurrence.departs_at < now))
+
+    window_end = now + timedelta(days=OCCURRENCE_WINDOW_DAYS)
+    result = await session.stream(
+        select(Travel.id, Travel.start_time, Travel.days_of_week)
+        .where(
+            Travel.start_time < window_end,
+            # Past one-off travels have no departures left
+            or_(Travel.start_time >= now, func.cardinality(Travel.days_of_week) > 0),
+        )
+        .execution_options(yield_per=INSERT_BATCH_SIZE)
+    )
+    async for travels in result.partitions():
+        await insert_occurrences(session, occurrence_rows(travels, now))
+
+    await session.commit()
@@ -0,0 +1,44 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    payload = json.dumps({"created_at": created_at.isoformat(), "id": item_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["created_at"]), str(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(stmt, model, cursor: Optional[str], limit: int):
+    """
+    Restrict a select to the page after `cursor`, newest first.
+
+    Parameters:
+        stmt: select statement over `model`
+        model: table model with `created_at` and `id` columns
+        cursor: token from a previous page's `next_cursor`, or None
+        limit: number of rows to fetch
+
+    Returns:
+        The statement ordered by (created_at, id) descending, after the cursor
+    """
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(model.created_at, model.id) < tuple_(created_at, item_id))
+
+    return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit)
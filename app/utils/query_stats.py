@@ -0,0 +1,149 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from starlette_prometheus import PrometheusMiddleware
+
+from app.metrics import DB_REQUEST_QUERIES, DB_REQUEST_SLOWEST_QUERY, DB_REQUEST_TIME
+
+DB_SERVER_TIMING = os.getenv("DB_SERVER_TIMING", "false").lower() == "true"
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+
+# Characters of a slow statement printed with its request
+SLOW_QUERY_PREVIEW = 500
+
+# Stats of the count_queries blocks open in the current context
+_open_stats: ContextVar[Tuple["QueryStats", ...]] = ContextVar("query_stats", default=())
+
+
+class QueryStats:
+    """Statements sent to the database while a count_queries block was open."""
+
+    def __init__(self):
+        self.statements: List[str] = []
+        # Seconds spent in statements that completed
+        self.duration = 0.0
+        self.slowest: Optional[str] = None
+        self.slowest_duration = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def record(self, statement: str, duration: float):
+        self.duration += duration
+        if self.slowest is None or duration > self.slowest_duration:
+            self.slowest = statement
+            self.slowest_duration = duration
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """
+    Count and time the SQL statements executed inside the block, including
+    those of requests served in the same task (as through
+    httpx.ASGITransport) and of tasks or threads started from it. BEGIN and
+    COMMIT are not counted.
+
+    Usage:
+        with count_queries() as queries:
+            await client.delete(f"/travel/{travel_id}")
+        assert queries.count == 1
+    """
+    stats = QueryStats()
+    token = _open_stats.set(_open_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _open_stats.reset(token)
+
+
+def instrument_queries(engine: Engine):
+    """Feed the statements engine executes to the open count_queries blocks."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def on_execute(connection, cursor, statement, parameters, context, executemany):
+        open_stats = _open_stats.get()
+        if open_stats:
+            for stats in open_stats:
+                stats.statements.append(statement)
+            # A connection runs one statement at a time
+            connection.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def on_executed(connection, cursor, statement, parameters, context, executemany):
+        open_stats = _open_stats.get()
+        if open_stats:
+            duration = time.perf_counter() - connection.info.pop("query_start")
+            for stats in open_stats:
+                stats.record(statement, duration)
+
+
+def server_timing(stats: QueryStats) -> str:
+    header = f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"'
+    if stats.slowest is not None:
+        header += f", db-slowest;dur={stats.slowest_duration * 1000:.2f}"
+    return header
+
+
+class QueryStatsMiddleware:
+    """
+    Exports the statement count, total statement time and slowest statement
+    of each request as db_request_* histograms, labeled like the
+    PrometheusMiddleware metrics. Requests whose slowest statement takes
+    DB_SLOW_QUERY_MS or more are printed with it.
+
+    With server_timing, responses carry a Server-Timing header with the
+    statements run before the response started (a streamed body's later
+    statements are only in the metrics).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        server_timing: bool = DB_SERVER_TIMING,
+        slow_query_ms: float = DB_SLOW_QUERY_MS,
+    ):
+        self.app = app
+        self.server_timing = server_timing
+        self.slow_query_ms = slow_query_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", server_timing(stats))
+            await send(message)
+
+        with count_queries() as stats:
+            try:
+                await self.app(scope, receive, send_with_timing if self.server_timing else send)
+            finally:
+                self.observe(Request(scope), stats)
+
+    def observe(self, request: Request, stats: QueryStats):
+        path_template, _ = PrometheusMiddleware.get_path_template(request)
+        labels = {"method": request.method, "path_template": path_template}
+        DB_REQUEST_QUERIES.labels(**labels).observe(stats.count)
+        DB_REQUEST_TIME.labels(**labels).observe(stats.duration)
+        if stats.slowest is None:
+            return
+
+        DB_REQUEST_SLOWEST_QUERY.labels(**labels).observe(stats.slowest_duration)
+        slowest_ms = stats.slowest_duration * 1000
+        if self.slow_query_ms and slowest_ms >= self.slow_query_ms:
+            statement = " ".join(stats.slowest.split())[:SLOW_QUERY_PREVIEW]
+            print(
+                f"Slow query in {request.method} {path_template}: {slowest_ms:.0f} ms "
+                f"({stats.count} queries, {stats.duration * 1000:.0f} ms total): {statement}"
+            )
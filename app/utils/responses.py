@@ -0,0 +1,25 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+class ModelResponse(Response):
+    """
+    JSON response that serializes pydantic models with their compiled
+    serializer in a single pass.
+
+    Returning it from a handler skips FastAPI's dump/re-validate/encode
+    round trip; keep `response_model` on the route for the OpenAPI schema.
+    Bytes are assumed to be JSON already (e.g. a cached body) and sent as-is.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return orjson.dumps(content)
@@ -0,0 +1,436 @@
+import math
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.travel import Travel
+from app.utils.spatial_index import Cell
+from app.utils.utils import bounding_box, haversine_distances, top_k_indices
+
+ROUTE_SIMPLIFY_TOLERANCE = float(os.getenv("ROUTE_SIMPLIFY_TOLERANCE", "30"))
+ROUTE_CELL_DEGREES = float(os.getenv("ROUTE_CELL_DEGREES", "0.01"))
+ROUTE_MATCH_MAX_RADIUS = int(os.getenv("ROUTE_MATCH_MAX_RADIUS", "5000"))
+
+# Columns of SegmentGrid.cell_arrays rows
+SEGMENT_COLUMNS = ("a_lat", "a_lon", "b_lat", "b_lon", "along", "owner")
+
+# Radius of Earth in meters
+R = 6371000
+METERS_PER_DEGREE = math.pi * R / 180
+
+Point = Tuple[float, float]
+
+
+class RouteMatch(NamedTuple):
+    travel_id: str
+    pickup_distance: float
+    dropoff_distance: float
+    detour: float
+
+
+def simplify_polyline(points: Sequence[Point], tolerance: float = ROUTE_SIMPLIFY_TOLERANCE):
+    """
+    Douglas-Peucker simplification of a (lat, lon) polyline.
+
+    Parameters:
+        points: sequence of (lat, lon) tuples
+        tolerance: float maximum distance in meters between the original
+            polyline and the simplified one
+
+    Returns:
+        List of the (lat, lon) points kept, always including both ends
+    """
+    if len(points) <= 2:
+        return list(points)
+
+    coords = np.asarray(points, dtype=np.float64)
+    scale = np.array(
+        [METERS_PER_DEGREE, METERS_PER_DEGREE * math.cos(math.radians(coords[:, 0].mean()))]
+    )
+    xy = coords * scale
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(xy[first + 1 : last], xy[first], xy[last])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return [tuple(point) for point in coords[keep].tolist()]
+
+
+def _segment_distances(points, a, b):
+    """Distances from each point to the segment a-b, all in planar meters."""
+    ab = b - a
+    length2 = ab @ ab
+    if length2 == 0:
+        return np.hypot(*(points - a).T)
+    t = np.clip((points - a) @ ab / length2, 0, 1)
+    return np.hypot(*(points - (a + t[:, None] * ab)).T)
+
+
+def route_points(
+    origin: Dict[str, float],
+    destination: Dict[str, float],
+    route: Optional[Iterable[Dict[str, float]]] = None,
+) -> List[Point]:
+    """
+    Build a travel's simplified route from its endpoints and optional path.
+
+    A travel without a path is matched along the straight line between its
+    origin and destination.
+
+    Returns:
+        List of (lat, lon) points from origin to destination
+    """
+    points = [(origin["latitude"], origin["longitude"])]
+    points.extend((point["latitude"], point["longitude"]) for point in route or [])
+    points.append((destination["latitude"], destination["longitude"]))
+    # Drop repeated points, e.g. a path that already starts at the origin
+    points = [point for i, point in enumerate(points) if i == 0 or point != points[i - 1]]
+    return simplify_polyline(points)
+
+
+def route_field(
+    origin: Dict[str, float],
+    destination: Dict[str, float],
+    route: Optional[Iterable[Dict[str, float]]] = None,
+) -> List[Dict[str, float]]:
+    """The simplified route as stored in Travel.route."""
+    return [
+        {"latitude": latitude, "longitude": longitude}
+        for latitude, longitude in route_points(origin, destination, route)
+    ]
+
+
+def travel_route(
+    origin: Dict[str, float],
+    destination: Dict[str, float],
+    route: Optional[List[Dict[str, float]]] = None,
+) -> List[Point]:
+    """The (lat, lon) points to index for a travel row, stored route first."""
+    if route:
+        return [(point["latitude"], point["longitude"]) for point in route]
+    return route_points(origin, destination)
+
+
+def segment_cells(a: Point, b: Point, cell_degrees: float) -> List[Cell]:
+    """Every grid cell the segment a-b passes through (2D DDA traversal)."""
+    (row, col), (end_row, end_col) = (
+        (math.floor(a[0] / cell_degrees), math.floor(a[1] / cell_degrees)),
+        (math.floor(b[0] / cell_degrees), math.floor(b[1] / cell_degrees)),
+    )
+    cells = [(row, col)]
+    d_lat, d_lon = b[0] - a[0], b[1] - a[1]
+    step_row = 1 if d_lat > 0 else -1
+    step_col = 1 if d_lon > 0 else -1
+
+    def first_crossing(start, delta, index, step):
+        if delta == 0:
+            return math.inf, math.inf
+        boundary = (index + (step > 0)) * cell_degrees
+        return (boundary - start) / delta, cell_degrees / abs(delta)
+
+    t_row, dt_row = first_crossing(a[0], d_lat, row, step_row)
+    t_col, dt_col = first_crossing(a[1], d_lon, col, step_col)
+    while (row, col) != (end_row, end_col):
+        if t_row < t_col:
+            row += step_row
+            t_row += dt_row
+        else:
+            col += step_col
+            t_col += dt_col
+        cells.append((row, col))
+        if min(t_row, t_col) > 1 + 1e-9 and (row, col) != (end_row, end_col):
+            # Floating point drift: the segment ends here, close the walk
+            cells.append((end_row, end_col))
+            break
+    return cells
+
+
+class SegmentGrid:
+    """
+    Route segments in flat arrays, bucketed into the grid cells they cross.
+
+    Removed routes leave dead segments in the flat arrays until the grid is
+    compacted; the per-cell arrays queries read are rebuilt without them.
+    """
+
+    def __init__(self, cell_degrees: float):
+        self.cell_degrees = cell_degrees
+        self.routes: Dict[str, List[Point]] = {}
+        self.segments: Dict[str, List[int]] = {}
+        self.owners: List[str] = []
+        self.cells: Dict[Cell, List[int]] = defaultdict(list)
+        # Per cell, the live segments as rows of SEGMENT_COLUMNS, built on demand
+        self.cell_arrays: Dict[Cell, np.ndarray] = {}
+        self.dead = 0
+        # Per segment: start and end (lat, lon), distance along the route at
+        # its start, and the slot in self.owners (-1 once removed)
+        self.size = 0
+        self.a = np.empty((0, 2))
+        self.b = np.empty((0, 2))
+        self.along = np.empty(0)
+        self.owner = np.empty(0, dtype=np.int64)
+
+    def _grow(self, needed: int):
+        capacity = len(self.along)
+        if self.size + needed <= capacity:
+            return
+        capacity = max(2 * capacity, self.size + needed, 1024)
+        a, b = np.empty((capacity, 2)), np.empty((capacity, 2))
+        along, owner = np.empty(capacity), np.full(capacity, -1, dtype=np.int64)
+        a[: self.size], b[: self.size] = self.a[: self.size], self.b[: self.size]
+        along[: self.size], owner[: self.size] = self.along[: self.size], self.owner[: self.size]
+        self.a, self.b, self.along, self.owner = a, b, along, owner
+
+    def add(self, travel_id: str, points: List[Point]):
+        self.remove(travel_id)
+        if len(points) < 2:
+            return
+        coords = np.asarray(points, dtype=np.float64)
+        lengths = haversine_distances(coords[:-1, ::-1], coords[1:, ::-1])
+        count = len(points) - 1
+
+        self._grow(count)
+        start = self.size
+        ids = list(range(start, start + count))
+        self.a[start : start + count] = coords[:-1]
+        self.b[start : start + count] = coords[1:]
+        self.along[start : start + count] = np.concatenate([[0.0], np.cumsum(lengths)[:-1]])
+        self.owner[start : start + count] = len(self.owners)
+        self.owners.append(travel_id)
+        self.size += count
+
+        for segment_id, a, b in zip(ids, points[:-1], points[1:]):
+            for cell in segment_cells(a, b, self.cell_degrees):
+                self.cells[cell].append(segment_id)
+                self.cell_arrays.pop(cell, None)
+        self.routes[travel_id] = points
+        self.segments[travel_id] = ids
+
+    def remove(self, travel_id: str):
+        ids = self.segments.pop(travel_id, None)
+        if ids is None:
+            return
+        points = self.routes.pop(travel_id)
+        self.owner[ids] = -1
+        self.dead += len(ids)
+        for a, b in zip(points[:-1], points[1:]):
+            for cell in segment_cells(a, b, self.cell_degrees):
+                self.cell_arrays.pop(cell, None)
+
+    def needs_compaction(self) -> bool:
+        return self.dead > max(1024, self.size // 2)
+
+    def _cell_array(self, cell: Cell) -> Optional[np.ndarray]:
+        array = self.cell_arrays.get(cell)
+        if array is None:
+            ids = self.cells.get(cell)
+            if not ids:
+                return None
+            ids = np.asarray(ids, dtype=np.int64)
+            ids = ids[self.owner[ids] >= 0]
+            array = self.cell_arrays[cell] = np.column_stack(
+                (self.a[ids], self.b[ids], self.along[ids], self.owner[ids])
+            )
+        return array
+
+    def segments_near(self, point: Point, radius: float) -> np.ndarray:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(point[0], point[1], radius)
+        min_row = math.floor(min_lat / self.cell_degrees)
+        max_row = math.floor(max_lat / self.cell_degrees)
+        min_col = math.floor(min_lon / self.cell_degrees)
+        max_col = math.floor(max_lon / self.cell_degrees)
+
+        cell_count = (max_row - min_row + 1) * (max_col - min_col + 1)
+        if cell_count > len(self.cells):
+            # Sparse grid or huge radius: walking the occupied cells is cheaper
+            cells = [
+                (row, col)
+                for row, col in self.cells
+                if min_row <= row <= max_row and min_col <= col <= max_col
+            ]
+        else:
+            cells = [
+                (row, col)
+                for row in range(min_row, max_row + 1)
+                for col in range(min_col, max_col + 1)
+            ]
+        arrays = [array for cell in cells if (array := self._cell_array(cell)) is not None]
+        if not arrays:
+            return np.empty((0, len(SEGMENT_COLUMNS)))
+        # A segment crossing several cells shows up once per cell; nearest()
+        # keeps one row per route anyway, so duplicates are left in
+        return np.concatenate(arrays)
+
+    def nearest(self, point: Point, radius: float):
+        """
+        Closest route position to point, for every route passing within radius.
+
+        Returns:
+            Tuple of arrays (owner slots, distances, distances along the route)
+        """
+        segments = self.segments_near(point, radius)
+
+        # Planar projection centered on the point, accurate at these scales
+        scale = np.array([METERS_PER_DEGREE, METERS_PER_DEGREE * math.cos(math.radians(point[0]))])
+        a = (segments[:, 0:2] - point) * scale
+        ab = (segments[:, 2:4] - segments[:, 0:2]) * scale
+        length2 = np.einsum("ij,ij->i", ab, ab)
+        t = np.clip(-np.einsum("ij,ij->i", a, ab) / np.where(length2 > 0, length2, 1), 0, 1)
+        distances = np.hypot(*(a + t[:, None] * ab).T)
+
+        close = distances <= radius
+        distances, segments, t, length2 = (
+            distances[close],
+            segments[close],
+            t[close],
+            length2[close],
+        )
+        owners = segments[:, 5].astype(np.int64)
+        along = segments[:, 4] + t * np.sqrt(length2)
+
+        # Keep the closest segment of each route
+        order = np.lexsort((distances, owners))
+        owners, distances, along = owners[order], distances[order], along[order]
+        first = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]]) if owners.size else owners
+        return owners[first], distances[first], along[first]
+
+
+class RouteMatcher:
+    """
+    Matches passengers to travels whose route passes near both their stops.
+
+    Like TravelSpatialIndex it lives in the worker process, is rebuilt on
+    startup and only sees writes made through this process afterwards, so
+    it is only built when TRAVEL_INDEX_ENABLED is set (single worker).
+    Until then add and remove do nothing.
+    """
+
+    def __init__(self, cell_degrees: float = ROUTE_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.ready = False
+        self._lock = threading.Lock()
+        self._grid = SegmentGrid(cell_degrees)
+        # Writes made while a compacted grid is being built, replayed onto it
+        self._pending: Optional[List[Tuple[str, Optional[List[Point]]]]] = None
+
+    def _write(self, travel_id: str, points: Optional[List[Point]]):
+        if not self.ready:
+            return
+        with self._lock:
+            if points is None:
+                self._grid.remove(travel_id)
+            else:
+                self._grid.add(travel_id, points)
+            if self._pending is not None:
+                self._pending.append((travel_id, points))
+            if self._pending is not None or not self._grid.needs_compaction():
+                return
+            grid, routes = self._grid, dict(self._grid.routes)
+            self._pending = []
+
+        # Rebuilt without the lock, so matches and writes go on meanwhile
+        compacted = SegmentGrid(self.cell_degrees)
+        for route_id, route in routes.items():
+            compacted.add(route_id, route)
+
+        with self._lock:
+            for route_id, route in self._pending:
+                if route is None:
+                    compacted.remove(route_id)
+                else:
+                    compacted.add(route_id, route)
+            # Unless load() replaced the grid in the meantime
+            if self._grid is grid:
+                self._grid = compacted
+            self._pending = None
+
+    def add(self, travel_id: str, points: List[Point]):
+        self._write(travel_id, points)
+
+    def add_many(self, routes: Iterable[Tuple[str, List[Point]]]):
+        for travel_id, points in routes:
+            self._write(travel_id, points)
+
+    def remove(self, travel_id: str):
+        self._write(travel_id, None)
+
+    def load(self, routes: Iterable[Tuple[str, List[Point]]]):
+        grid = SegmentGrid(self.cell_degrees)
+        for travel_id, points in routes:
+            grid.add(travel_id, points)
+
+        with self._lock:
+            self._grid = grid
+            self.ready = True
+
+    async def rebuild(self, session: AsyncSession):
+        rows = await session.exec(
+            select(Travel.id, Travel.origin, Travel.destination, Travel.route)
+        )
+        self.load(
+            (travel_id, travel_route(origin, destination, route))
+            for travel_id, origin, destination, route in rows
+            if origin and destination
+        )
+
+    def match(
+        self, pickup: Point, dropoff: Point, radius: float, limit: Optional[int] = None
+    ) -> List[RouteMatch]:
+        """
+        Find the travels whose route passes within radius of both the
+        pickup and the drop-off, in that order.
+
+        The detour is the extra distance the driver covers to leave the route
+        at its closest point to each stop and come back.
+
+        Parameters:
+            pickup: tuple of float (lat, lon)
+            dropoff: tuple of float (lat, lon)
+            radius: float maximum distance in meters from the route to each stop
+            limit: keep only the best matches
+
+        Returns:
+            List of RouteMatch, smallest detour first
+        """
+        with self._lock:
+            p_owners, p_distances, p_along = self._grid.nearest(pickup, radius)
+            if not p_owners.size:
+                return []
+            d_owners, d_distances, d_along = self._grid.nearest(dropoff, radius)
+            owners, p_index, d_index = np.intersect1d(
+                p_owners, d_owners, assume_unique=True, return_indices=True
+            )
+            travel_ids = [self._grid.owners[slot] for slot in owners.tolist()]
+
+        # The driver must reach the pickup before the drop-off
+        forward = p_along[p_index] <= d_along[d_index]
+        p_distances, d_distances = p_distances[p_index][forward], d_distances[d_index][forward]
+        travel_ids = [travel_id for travel_id, keep in zip(travel_ids, forward) if keep]
+
+        detours = 2 * (p_distances + d_distances)
+        best = top_k_indices(detours, detours.size if limit is None else limit)
+        return [
+            RouteMatch(
+                travel_ids[i], float(p_distances[i]), float(d_distances[i]), float(detours[i])
+            )
+            for i in best.tolist()
+        ]
+
+
+route_matcher = RouteMatcher()
@@ -0,0 +1,279 @@
+import math
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from app.types.travel import naive_utc
+from app.utils.cache_utils import CacheBackend, ReadThroughCache, create_cache_backend
+from app.utils.utils import bounding_box
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "10"))
+SEARCH_CACHE_CELL_DEGREES = float(os.getenv("SEARCH_CACHE_CELL_DEGREES", "0.005"))
+SEARCH_CACHE_REGION_DEGREES = float(os.getenv("SEARCH_CACHE_REGION_DEGREES", "0.05"))
+SEARCH_CACHE_WINDOW_SECONDS = int(os.getenv("SEARCH_CACHE_WINDOW_SECONDS", "60"))
+SEARCH_CACHE_MAX_RADIUS = int(os.getenv("SEARCH_CACHE_MAX_RADIUS", "4000"))
+SEARCH_CACHE_MAX_CANDIDATES = int(os.getenv("SEARCH_CACHE_MAX_CANDIDATES", "1000"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+
+# Radius buckets double from here: 250, 500, 1000, ... meters
+MIN_RADIUS_BUCKET = 250
+# Cached instead of the candidates when an area has too many to keep
+TOO_MANY = b"!"
+# Decoded candidate sets kept per worker, so hits skip parsing
+DECODED_ENTRIES = 256
+
+EPOCH = datetime(1970, 1, 1)
+# Meters per degree of latitude
+METERS_PER_DEGREE = math.pi * 6371000 / 180
+
+Cell = Tuple[int, int]
+# (id, origin lon, origin lat, destination lon, destination lat, start_time,
+#  days_of_week, created_at, travel updated_at, driver id, driver updated_at)
+Candidate = tuple
+
+
+class CandidateSet(NamedTuple):
+    """Decoded cache entry."""
+
+    candidates: List[Candidate]
+    items: List[str]
+    # (origin lon, origin lat, destination lon, destination lat) per candidate
+    coords: np.ndarray
+    start_times: np.ndarray
+
+
+class SearchArea(NamedTuple):
+    """A cache entry's key and the widened search that fills it."""
+
+    key: str
+    origin: Tuple[float, float]
+    destination: Tuple[float, float]
+    radius: float
+    departure_after: datetime
+    departure_before: Optional[datetime]
+
+
+def radius_bucket(radius: float) -> Optional[int]:
+    """Smallest bucket holding radius, or None when it is too large to cache."""
+    if radius > SEARCH_CACHE_MAX_RADIUS:
+        return None
+    bucket = MIN_RADIUS_BUCKET
+    while bucket < radius:
+        bucket *= 2
+    return bucket
+
+
+def floor_time(value: datetime, seconds: int) -> datetime:
+    return value - (value - EPOCH) % timedelta(seconds=seconds)
+
+
+def ceil_time(value: datetime, seconds: int) -> datetime:
+    floor = floor_time(value, seconds)
+    return floor if floor == value else floor + timedelta(seconds=seconds)
+
+
+def pack_candidates(candidates: List[Candidate], items: List[str]) -> bytes:
+    """
+    Serialize an area's candidates.
+
+    Parameters:
+        candidates: one Candidate tuple per travel, newest first
+        items: each travel's search item, already JSON-encoded
+    """
+    return orjson.dumps({"candidates": candidates, "items": items})
+
+
+def unpack_candidates(value: bytes) -> Optional[CandidateSet]:
+    """Inverse of pack_candidates; None for an area with too many candidates."""
+    if value == TOO_MANY:
+        return None
+    payload = orjson.loads(value)
+    parse = datetime.fromisoformat
+    candidates = [
+        (
+            travel_id,
+            o_lon,
+            o_lat,
+            d_lon,
+            d_lat,
+            parse(start_time),
+            days_of_week,
+            parse(created_at),
+            parse(travel_updated_at) if travel_updated_at else None,
+            driver_id,
+            parse(driver_updated_at) if driver_updated_at else None,
+        )
+        for (
+            travel_id,
+            o_lon,
+            o_lat,
+            d_lon,
+            d_lat,
+            start_time,
+            days_of_week,
+            created_at,
+            travel_updated_at,
+            driver_id,
+            driver_updated_at,
+        ) in payload["candidates"]
+    ]
+    return CandidateSet(
+        candidates,
+        payload["items"],
+        np.array([candidate[1:5] for candidate in candidates], dtype=np.float64).reshape(-1, 4),
+        np.array([candidate[5] for candidate in candidates], dtype="datetime64[us]"),
+    )
+
+
+class SearchCache:
+    """
+    Caches search candidates per (origin cell, destination cell, radius
+    bucket, departure window, filters).
+
+    An entry holds every travel that could match any search of its key:
+    the search is run once from the cells' centers with the radius widened
+    by half a cell diagonal, and each request then applies its exact
+    radius and departure filters in memory.
+
+    Entries are not deleted on writes. Their keys carry a counter per
+    coarse region around the origin cell, and a write to a travel bumps the
+    counter of the region its origin is in: every entry that could contain
+    the travel stops being looked up and just expires.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl: float = SEARCH_CACHE_TTL,
+        cell_degrees: float = SEARCH_CACHE_CELL_DEGREES,
+        region_degrees: float = SEARCH_CACHE_REGION_DEGREES,
+    ):
+        self.backend = backend
+        self.cache = ReadThroughCache(backend, ttl)
+        self.cell_degrees = cell_degrees
+        self.region_degrees = region_degrees
+        self._decoded: "OrderedDict[str, Tuple[bytes, Optional[CandidateSet]]]" = OrderedDict()
+
+    def cell_of(self, latitude: float, longitude: float) -> Cell:
+        return (
+            math.floor(latitude / self.cell_degrees),
+            math.floor(longitude / self.cell_degrees),
+        )
+
+    def center_of(self, cell: Cell) -> Tuple[float, float]:
+        return ((cell[0] + 0.5) * self.cell_degrees, (cell[1] + 0.5) * self.cell_degrees)
+
+    def region_key(self, latitude: float, longitude: float) -> str:
+        row = math.floor(latitude / self.region_degrees)
+        col = math.floor(longitude / self.region_degrees)
+        return f"search-region:{row}:{col}"
+
+    def regions_near(self, latitude: float, longitude: float, radius: float) -> List[str]:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius)
+        min_row = math.floor(min_lat / self.region_degrees)
+        max_row = math.floor(max_lat / self.region_degrees)
+        min_col = math.floor(min_lon / self.region_degrees)
+        max_col = math.floor(max_lon / self.region_degrees)
+        return [
+            f"search-region:{row}:{col}"
+            for row in range(min_row, max_row + 1)
+            for col in range(min_col, max_col + 1)
+        ]
+
+    async def area(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        radius: float,
+        departure_after: datetime,
+        departure_before: Optional[datetime],
+        travel_status: Optional[str],
+        min_seats: int,
+    ) -> Optional[SearchArea]:
+        """
+        Find the cache entry answering a search.
+
+        Parameters:
+            origin: tuple of float (lat, lon)
+            destination: tuple of float (lat, lon)
+            radius: float radius in meters
+            departure_after, departure_before, travel_status, min_seats:
+                the search's filters
+
+        Returns:
+            The entry's SearchArea, or None when the radius is too large to cache
+        """
+        bucket = radius_bucket(radius)
+        if bucket is None:
+            return None
+
+        origin_cell = self.cell_of(*origin)
+        destination_cell = self.cell_of(*destination)
+        half_diagonal = self.cell_degrees * METERS_PER_DEGREE * math.sqrt(2) / 2
+        widened = bucket + half_diagonal
+        # Keys and the widened search use naive UTC, like the timestamp columns
+        after = floor_time(naive_utc(departure_after), SEARCH_CACHE_WINDOW_SECONDS)
+        before = departure_before and ceil_time(
+            naive_utc(departure_before), SEARCH_CACHE_WINDOW_SECONDS
+        )
+
+        center = self.center_of(origin_cell)
+        generations = await self.backend.counters(*self.regions_near(*center, widened))
+        key = ":".join(
+            map(
+                str,
+                (
+                    "search",
+                    *origin_cell,
+                    *destination_cell,
+                    bucket,
+                    after.isoformat(),
+                    before.isoformat() if before else "",
+                    travel_status or "",
+                    min_seats,
+                    ".".join(map(str, generations)),
+                ),
+            )
+        )
+        return SearchArea(key, center, self.center_of(destination_cell), widened, after, before)
+
+    async def load(
+        self, area: SearchArea, loader: Callable[[], Awaitable[bytes]]
+    ) -> Optional[CandidateSet]:
+        """
+        Return an area's candidates, calling loader (which returns
+        pack_candidates or TOO_MANY) on a miss.
+
+        Returns:
+            The CandidateSet, or None when the area has too many candidates
+        """
+        value = await self.cache.get_or_load(area.key, loader)
+        decoded = self._decoded.get(area.key)
+        # The memory backend hands back the same object; Redis an equal copy
+        if decoded is None or (decoded[0] is not value and decoded[0] != value):
+            decoded = (value, unpack_candidates(value))
+        self._decoded[area.key] = decoded
+        self._decoded.move_to_end(area.key)
+        while len(self._decoded) > DECODED_ENTRIES:
+            self._decoded.popitem(last=False)
+        return decoded[1]
+
+    async def invalidate(self, *origins: Optional[Dict[str, float]]):
+        """Drop every entry that could hold a travel starting at one of origins."""
+        keys = {
+            self.region_key(origin["latitude"], origin["longitude"]) for origin in origins if origin
+        }
+        for key in keys:
+            await self.backend.incr(key)
+
+    async def close(self):
+        await self.cache.close()
+
+
+# Entries hold whole candidate sets, so the memory backend keeps fewer of them
+search_cache = SearchCache(create_cache_backend(max_entries=SEARCH_CACHE_MAX_ENTRIES))
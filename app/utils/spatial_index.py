@@ -0,0 +1,174 @@
+import math
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.travel import Travel
+from app.utils.utils import bounding_box
+
+Cell = Tuple[int, int]
+
+# Off by default: the in-memory indexes are only correct with a single worker
+TRAVEL_INDEX_ENABLED = os.getenv("TRAVEL_INDEX_ENABLED", "false").lower() == "true"
+TRAVEL_INDEX_CELL_DEGREES = float(os.getenv("TRAVEL_INDEX_CELL_DEGREES", "0.01"))
+
+
+class GridIndex:
+    """Buckets ids into fixed-size latitude/longitude cells."""
+
+    def __init__(self, cell_degrees: float):
+        self.cell_degrees = cell_degrees
+        self.cells: Dict[Cell, Set[str]] = defaultdict(set)
+        self.positions: Dict[str, Cell] = {}
+
+    def cell_of(self, latitude: float, longitude: float) -> Cell:
+        return (
+            math.floor(latitude / self.cell_degrees),
+            math.floor(longitude / self.cell_degrees),
+        )
+
+    def add(self, item_id: str, latitude: float, longitude: float):
+        self.remove(item_id)
+        cell = self.cell_of(latitude, longitude)
+        self.cells[cell].add(item_id)
+        self.positions[item_id] = cell
+
+    def remove(self, item_id: str):
+        cell = self.positions.pop(item_id, None)
+        if cell is None:
+            return
+        bucket = self.cells[cell]
+        bucket.discard(item_id)
+        if not bucket:
+            del self.cells[cell]
+
+    def query(self, latitude: float, longitude: float, radius: float) -> Set[str]:
+        """Return the ids stored in every cell overlapping the circle's bounding box."""
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius)
+        min_row, min_col = self.cell_of(min_lat, min_lon)
+        max_row, max_col = self.cell_of(max_lat, max_lon)
+
+        found = set()
+        cell_count = (max_row - min_row + 1) * (max_col - min_col + 1)
+        if cell_count > len(self.cells):
+            # Sparse index or huge radius: walking the occupied cells is cheaper
+            for (row, col), bucket in self.cells.items():
+                if min_row <= row <= max_row and min_col <= col <= max_col:
+                    found.update(bucket)
+            return found
+
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                bucket = self.cells.get((row, col))
+                if bucket:
+                    found.update(bucket)
+        return found
+
+
+class TravelSpatialIndex:
+    """
+    In-memory index of travels keyed by origin and destination cells.
+
+    The index lives in the worker process, so it only reflects writes made
+    through this process after the last rebuild: with several workers a
+    search would miss rides written through the others. It is only built
+    when TRAVEL_INDEX_ENABLED is set, for single-worker deployments;
+    otherwise searches use the SQL bounding box filter alone, and add,
+    update and remove do nothing.
+    """
+
+    def __init__(self, cell_degrees: float = TRAVEL_INDEX_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.ready = False
+        self._lock = threading.Lock()
+        self._origins = GridIndex(cell_degrees)
+        self._destinations = GridIndex(cell_degrees)
+
+    def add(self, travel_id: str, origin: Dict[str, float], destination: Dict[str, float]):
+        if not self.ready:
+            return
+        with self._lock:
+            self._origins.add(travel_id, origin["latitude"], origin["longitude"])
+            self._destinations.add(travel_id, destination["latitude"], destination["longitude"])
+
+    def update(
+        self,
+        travel_id: str,
+        origin: Optional[Dict[str, float]] = None,
+        destination: Optional[Dict[str, float]] = None,
+    ):
+        if not self.ready:
+            return
+        with self._lock:
+            # Travels without coordinates were never indexed; indexing one
+            # endpoint alone would leave it half there
+            if travel_id not in self._origins.positions:
+                return
+            if origin:
+                self._origins.add(travel_id, origin["latitude"], origin["longitude"])
+            if destination:
+                self._destinations.add(travel_id, destination["latitude"], destination["longitude"])
+
+    def remove(self, travel_id: str):
+        if not self.ready:
+            return
+        with self._lock:
+            self._origins.remove(travel_id)
+            self._destinations.remove(travel_id)
+
+    def candidates(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        radius: float,
+    ) -> Set[str]:
+        """
+        Find the travels whose origin and destination cells overlap both search circles.
+
+        Parameters:
+            origin: tuple of float (lat, lon)
+            destination: tuple of float (lat, lon)
+            radius: float radius in meters
+
+        Returns:
+            Set of candidate travel ids, still to be checked against the exact radius
+        """
+        with self._lock:
+            origin_ids = self._origins.query(*origin, radius)
+            if not origin_ids:
+                return set()
+            destination_ids = self._destinations.query(*destination, radius)
+        return origin_ids & destination_ids
+
+    def load(self, rows: Iterable[Tuple[str, float, float, float, float]]):
+        origins = GridIndex(self.cell_degrees)
+        destinations = GridIndex(self.cell_degrees)
+        for travel_id, o_lat, o_lon, d_lat, d_lon in rows:
+            if None in (o_lat, o_lon, d_lat, d_lon):
+                continue
+            origins.add(travel_id, o_lat, o_lon)
+            destinations.add(travel_id, d_lat, d_lon)
+
+        with self._lock:
+            self._origins = origins
+            self._destinations = destinations
+            self.ready = True
+
+    async def rebuild(self, session: AsyncSession):
+        rows = await session.exec(
+            select(
+                Travel.id,
+                Travel.origin_latitude,
+                Travel.origin_longitude,
+                Travel.destination_latitude,
+                Travel.destination_longitude,
+            )
+        )
+        self.load(rows)
+
+
+travel_index = TravelSpatialIndex()
@@ -2,20 +2,14 @@ import math
 import os
 from io import BytesIO
 
-import boto3
+import numpy as np
 from botocore.exceptions import NoCredentialsError
 from dotenv import load_dotenv
 from fastapi import HTTPException
 
-load_dotenv("compose/.env")
+from app.utils.aws_utils import get_aws_client
 
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-    aws_session_token=os.getenv("AWS_SESSION_TOKEN"),
-    region_name=os.getenv("AWS_DEFAULT_REGION"),
-)
+load_dotenv("compose/.env")
 
 REGION_NAME = os.getenv("AWS_DEFAULT_REGION")
 BUCKET_NAME = os.getenv("BUCKET_NAME")
@@ -61,6 +55,124 @@ def haversine_distance(coord1, coord2):
     return distance
 
 
+def bounding_box(latitude, longitude, radius):
+    """
+    Calculate the latitude/longitude box that encloses a circle
+    on the Earth's surface, used as a cheap, indexable pre-filter.
+
+    Parameters:
+        latitude: float center latitude in decimal degrees
+        longitude: float center longitude in decimal degrees
+        radius: float radius in meters
+
+    Returns:
+        Tuple of float (min_lat, max_lat, min_lon, max_lon)
+    """
+    # Radius of Earth in meters
+    R = 6371000
+
+    delta_lat = math.degrees(radius / R)
+    min_lat = max(latitude - delta_lat, -90.0)
+    max_lat = min(latitude + delta_lat, 90.0)
+
+    # Near the poles the circle spans every meridian
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-12:
+        return min_lat, max_lat, -180.0, 180.0
+
+    delta_lon = math.degrees(radius / (R * cos_lat))
+    min_lon = max(longitude - delta_lon, -180.0)
+    max_lon = min(longitude + delta_lon, 180.0)
+
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def haversine_distances(coords1, coords2):
+    """
+    Vectorized version of haversine_distance.
+
+    Parameters:
+        coords1: array-like of shape (..., 2) with (lon, lat) pairs
+        coords2: array-like of shape (..., 2) with (lon, lat) pairs,
+            broadcastable against coords1 (e.g. a single point)
+
+    Returns:
+        Distances in meters as a numpy array
+    """
+    # Radius of Earth in meters
+    R = 6371000
+
+    coords1 = np.radians(np.asarray(coords1, dtype=np.float64))
+    coords2 = np.radians(np.asarray(coords2, dtype=np.float64))
+
+    lon1, lat1 = coords1[..., 0], coords1[..., 1]
+    lon2, lat2 = coords2[..., 0], coords2[..., 1]
+
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return R * c
+
+
+def within_radius(coords, center, radius):
+    """
+    Check which points lie within radius meters of center.
+
+    Points outside the circle's bounding box are rejected with plain
+    comparisons, so the trigonometry only runs on the remaining ones.
+
+    Parameters:
+        coords: array-like of shape (N, 2) with (lon, lat) pairs
+        center: tuple of float (lon, lat)
+        radius: float radius in meters
+
+    Returns:
+        Boolean numpy array of shape (N,)
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    lon, lat = center
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius)
+
+    mask = (
+        (coords[:, 0] >= min_lon)
+        & (coords[:, 0] <= max_lon)
+        & (coords[:, 1] >= min_lat)
+        & (coords[:, 1] <= max_lat)
+    )
+    candidates = np.flatnonzero(mask)
+    if candidates.size:
+        mask[candidates] = haversine_distances(coords[candidates], center) <= radius
+
+    return mask
+
+
+def top_k_indices(scores, k):
+    """
+    Indexes of the k lowest scores, best first.
+
+    Uses a partial sort, so only the k winners are ever fully ordered.
+
+    Parameters:
+        scores: 1-D array-like of float
+        k: number of indexes to return
+
+    Returns:
+        Integer numpy array of at most k indexes
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < scores.size:
+        best = np.argpartition(scores, k - 1)[:k]
+    else:
+        best = np.arange(scores.size)
+    return best[np.argsort(scores[best], kind="stable")]
+
+
 def upload_user_photo(user_id, file):
 
     if file.content_type not in ["image/png", "image/jpeg"]:
@@ -73,7 +185,7 @@ def upload_user_photo(user_id, file):
 
     try:
         contents = file.file.read()
-        s3.upload_fileobj(
+        get_aws_client("s3").upload_fileobj(
             Fileobj=BytesIO(contents),
             Bucket=BUCKET_NAME,
             Key=filename,
@@ -94,6 +206,6 @@ def delete_user_photo(user_id: str):
     filename = f"users/user_{user_id}.png"
 
     try:
-        s3.delete_object(Bucket=BUCKET_NAME, Key=filename)
+        get_aws_client("s3").delete_object(Bucket=BUCKET_NAME, Key=filename)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao deletar foto: {str(e)}")
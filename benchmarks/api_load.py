@@ -0,0 +1,407 @@
+"""
+Load-test the API in process at a fixed concurrency: GET /travel, POST /travel,
+GET /users and the auth path (login, and verifying tokens never seen before).
+Reports p50/p95/p99 latency and throughput per scenario.
+
+Postgres is seeded with users and rides (deleted afterwards). Cognito, S3 and
+Secrets Manager are replaced by local stubs, and requests carry RS256 tokens
+signed by a key the stubbed JWKS endpoint serves, so the real AuthBearer runs.
+
+--save writes the results to a baseline JSON; --baseline compares a run with
+one and exits with status 1 when a scenario got slower than --tolerance allows.
+
+Requires a reachable Postgres configured through the usual POSTGRES_* variables.
+
+Usage:
+    python -m benchmarks.api_load --users 1000 --rides 10000 --save baseline.json
+    python -m benchmarks.api_load --users 1000 --rides 10000 --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+from uuid import uuid4
+
+import httpx
+import numpy as np
+import rsa
+from jose import jwt
+from jose.backends import RSAKey
+from sqlalchemy import delete, insert, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import async_engine, create_db_and_tables
+from app.main import app
+from app.models.travel import Travel, coordinate_fields
+from app.models.user import User
+from app.types.travel import utc_now
+from app.utils.auth_utils import auth_secrets_cache, jwks_cache
+from app.utils.aws_utils import aws_clients
+
+# Seeded users all share this domain, so leftovers of an aborted run are cleaned up too
+EMAIL_DOMAIN = "bench.cinbora.test"
+KID = "bench"
+# Rows per seeding INSERT, well under Postgres' parameter limit
+SEED_BATCH_SIZE = 1000
+
+CIN = (-8.0556, -34.9516)
+# Neighborhoods rides to the CIn start from
+HUBS = [(-8.1196, -34.9010), (-8.0476, -34.8770), (-8.0280, -34.9180), (-8.0630, -35.0000)]
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+class StubAWSClient:
+    def close(self):
+        pass
+
+
+class StubSecretsManager(StubAWSClient):
+    def get_secret_value(self, SecretId):
+        secrets = {
+            "client_id": "bench-client",
+            "client_secret": "bench-secret",
+            "jwk_url": "http://jwks.invalid",
+            "user_pool_id": "bench-pool",
+        }
+        return {"SecretString": json.dumps(secrets)}
+
+
+class StubCognito(StubAWSClient):
+    def __init__(self, token: str):
+        self.token = token
+
+    def initiate_auth(self, **kwargs):
+        tokens = {"AccessToken": self.token, "IdToken": self.token, "RefreshToken": "refresh"}
+        return {"AuthenticationResult": tokens}
+
+    def sign_up(self, **kwargs):
+        return {"UserConfirmed": False}
+
+    def confirm_sign_up(self, **kwargs):
+        return {"Session": "session"}
+
+    def global_sign_out(self, **kwargs):
+        return {}
+
+    def set_user_password(self, **kwargs):
+        return {}
+
+
+class StubS3(StubAWSClient):
+    def upload_fileobj(self, **kwargs):
+        pass
+
+    def delete_object(self, **kwargs):
+        pass
+
+
+def sign_token(private_pem: str, username: str) -> str:
+    claims = {
+        "sub": str(uuid4()),
+        "username": username,
+        "token_use": "access",
+        "exp": int(time.time()) + 3600,
+    }
+    return jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": KID})
+
+
+def install_stubs(bits: int) -> str:
+    """Replace AWS and the JWKS endpoint with local stubs; returns the signing key."""
+    _, private_key = rsa.newkeys(bits)
+    private_pem = private_key.save_pkcs1().decode()
+    public_jwk = {**RSAKey(private_pem, "RS256").public_key().to_dict(), "kid": KID}
+
+    stubs = {
+        "secretsmanager": StubSecretsManager(),
+        "cognito-idp": StubCognito(sign_token(private_pem, "bench")),
+        "s3": StubS3(),
+    }
+    aws_clients.get = stubs.__getitem__
+    auth_secrets_cache.invalidate()
+    jwks_cache.loader = lambda: {"keys": [public_jwk]}
+    return private_pem
+
+
+def jitter(rng: random.Random, point, degrees: float):
+    return {
+        "latitude": point[0] + rng.uniform(-degrees, degrees),
+        "longitude": point[1] + rng.uniform(-degrees, degrees),
+    }
+
+
+def ride(rng: random.Random, driver_id: str, now: datetime) -> Dict[str, Any]:
+    return {
+        "id_driver": driver_id,
+        "origin": jitter(rng, rng.choice(HUBS), 0.02),
+        "destination": jitter(rng, CIN, 0.005),
+        "days_of_week": rng.choice([None, ["monday", "wednesday", "friday"]]),
+        "price": rng.choice([4.0, 5.0, 6.0]),
+        "available_seats": rng.randint(1, 4),
+        "status": "open",
+        "description": "Carona para o CIn",
+        "start_time": now + timedelta(minutes=rng.randint(10, 20000)),
+    }
+
+
+async def cleanup():
+    bench_users = select(User.id).where(User.email.like(f"%@{EMAIL_DOMAIN}"))
+    async with AsyncSession(async_engine) as session:
+        # Occurrences go with their travels through ON DELETE CASCADE
+        await session.exec(delete(Travel).where(Travel.id_driver.in_(bench_users)))
+        await session.exec(delete(User).where(User.email.like(f"%@{EMAIL_DOMAIN}")))
+        await session.commit()
+
+
+async def seed(rng: random.Random, users: int, rides: int) -> List[Dict[str, Any]]:
+    now = utc_now()
+    user_rows = [
+        {
+            "id": str(uuid4()),
+            "name": f"Bench {i}",
+            "email": f"bench{i}@{EMAIL_DOMAIN}",
+            "phone": "+5581999999999",
+            "photo": "",
+            "gender": "",
+            "score": 5.0,
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": now - timedelta(seconds=i),
+        }
+        for i in range(users)
+    ]
+    travel_rows = []
+    for i in range(rides):
+        row = ride(rng, rng.choice(user_rows)["id"], now)
+        created_at = now - timedelta(seconds=i)
+        travel_rows.append(
+            {
+                **row,
+                **coordinate_fields(row),
+                "id": str(uuid4()),
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+        )
+
+    async with AsyncSession(async_engine) as session:
+        for table, rows in ((User, user_rows), (Travel, travel_rows)):
+            for offset in range(0, len(rows), SEED_BATCH_SIZE):
+                await session.exec(insert(table).values(rows[offset : offset + SEED_BATCH_SIZE]))
+        await session.commit()
+    return user_rows
+
+
+async def run(
+    client: httpx.AsyncClient,
+    requests: List[Request],
+    concurrency: int,
+    expected: int,
+) -> Dict[str, float]:
+    """
+    Send requests with concurrency workers, each starting its next request
+    as soon as the previous one answers.
+
+    Returns:
+        Latency percentiles in milliseconds, throughput and error count
+    """
+    latencies = []
+    errors = 0
+    remaining = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for method, url, kwargs in remaining:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != expected:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50": p50,
+        "p95": p95,
+        "p99": p99,
+    }
+
+
+def scenarios(
+    rng: random.Random, users: List[Dict[str, Any]], private_pem: str, args
+) -> Dict[str, Tuple[int, int, Callable[[], Request]]]:
+    """Each scenario's (expected status, number of requests, request factory)."""
+    token = sign_token(private_pem, "bench")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def search():
+        params = {
+            **{
+                f"origin_{key}": value for key, value in jitter(rng, rng.choice(HUBS), 0.01).items()
+            },
+            **{f"destination_{key}": value for key, value in jitter(rng, CIN, 0.003).items()},
+            "radius": args.radius,
+        }
+        return "GET", "/travel/", {"params": params, "headers": headers}
+
+    def create():
+        body = ride(rng, rng.choice(users)["id"], utc_now())
+        body["start_time"] = body["start_time"].isoformat()
+        return "POST", "/travel/", {"json": body, "headers": headers}
+
+    def list_users():
+        return "GET", "/users/", {"params": {"limit": 20}, "headers": headers}
+
+    def login():
+        params = {"email": rng.choice(users)["email"], "password": "password"}
+        return "POST", "/auth/login", {"params": params}
+
+    def verify():
+        # A token the AuthBearer cache has not seen yet
+        fresh = {"Authorization": f"Bearer {sign_token(private_pem, 'bench')}"}
+        return "GET", f"/users/{rng.choice(users)['id']}", {"headers": fresh}
+
+    return {
+        "search": (200, args.requests, search),
+        "create": (201, args.requests, create),
+        "list_users": (200, args.requests, list_users),
+        "login": (200, args.requests, login),
+        "verify_token": (200, args.fresh_tokens, verify),
+    }
+
+
+def print_results(results: Dict[str, Dict[str, float]]):
+    print(
+        f"{'scenario':<14} {'requests':>8} {'errors':>6} {'req/s':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<14} {result['requests']:>8} {result['errors']:>6} "
+            f"{result['throughput']:>9.1f} {result['p50']:>9.2f} "
+            f"{result['p95']:>9.2f} {result['p99']:>9.2f}"
+        )
+
+
+def compare(
+    baseline: Dict[str, Dict[str, float]],
+    results: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """
+    Diff a run against a baseline.
+
+    Parameters:
+        baseline: the "results" of a saved run
+        results: this run's results
+        tolerance: allowed relative change, e.g. 0.2 for 20%
+
+    Returns:
+        One message per regression: a percentile more than tolerance above
+        the baseline, throughput more than tolerance below it, or new errors
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in ("p50", "p95", "p99"):
+            if result[metric] > before[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name} {metric} {before[metric]:.2f} -> {result[metric]:.2f} ms"
+                )
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name} throughput {before['throughput']:.1f} -> {result['throughput']:.1f} req/s"
+            )
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{name} errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+async def main(args) -> int:
+    rng = random.Random(args.seed)
+    private_pem = install_stubs(args.key_bits)
+
+    create_db_and_tables()
+    await cleanup()
+    results = {}
+    try:
+        users = await seed(rng, args.users, args.rides)
+        # Startup builds the spatial indexes and occurrences from the seeded rows
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for name, (expected, total, make_request) in scenarios(
+                    rng, users, private_pem, args
+                ).items():
+                    if args.only and name not in args.only:
+                        continue
+                    # Built up front, so signing tokens or encoding bodies is not timed
+                    warmup = [make_request() for _ in range(args.warmup)]
+                    requests = [make_request() for _ in range(total)]
+                    # Some handlers print every request; keep the report readable
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        await run(client, warmup, args.concurrency, expected)
+                        results[name] = await run(client, requests, args.concurrency, expected)
+    finally:
+        await cleanup()
+        await async_engine.dispose()
+
+    print(
+        f"{args.users} users, {args.rides} rides, concurrency {args.concurrency}, "
+        f"{args.requests} requests per scenario"
+    )
+    print_results(results)
+
+    config = {
+        key: getattr(args, key) for key in ("users", "rides", "concurrency", "requests", "radius")
+    }
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"config": config, "results": results}, file, indent=2)
+        print(f"baseline saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["config"] != config:
+            print(f"warning: baseline was run with {baseline['config']}")
+        regressions = compare(baseline["results"], results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rides", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests first")
+    # Each needs a freshly signed token, slow with the pure-Python rsa backend
+    parser.add_argument("--fresh-tokens", type=int, default=200, help="verify_token requests")
+    parser.add_argument("--radius", type=int, default=1000)
+    parser.add_argument("--key-bits", type=int, default=2048)
+    parser.add_argument("--only", nargs="*", help="scenarios to run (all by default)")
+    parser.add_argument("--save", help="write the results to this baseline JSON")
+    parser.add_argument("--baseline", help="compare with this baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
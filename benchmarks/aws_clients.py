@@ -0,0 +1,48 @@
+"""
+Measure the per-request overhead of building a boto3 client versus reusing
+one from the shared AWSClients registry. No AWS calls are made.
+
+Usage:
+    python -m benchmarks.aws_clients --iterations 200
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+import boto3
+
+from app.utils.aws_utils import AWSClients
+
+
+def measure(label: str, get_client, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        get_client()
+    per_call_ms = (time.perf_counter() - start) / iterations * 1000
+
+    # Allocation tracing is slow, so memory is sampled on a single call
+    tracemalloc.start()
+    get_client()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<22} {per_call_ms:9.3f} ms/request  peak {peak / 1024:9.1f} KiB/request")
+
+
+def main(iterations: int, service: str):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    registry = AWSClients()
+    registry.get(service)
+
+    measure("new session + client", lambda: boto3.session.Session().client(service), iterations)
+    measure("shared registry", lambda: registry.get(service), iterations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--service", default="cognito-idp")
+    args = parser.parse_args()
+    main(args.iterations, args.service)
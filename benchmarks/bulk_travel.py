@@ -0,0 +1,109 @@
+"""
+Compare creating and patching rides one request at a time against the
+POST/PATCH /travel/bulk endpoints. Rows created here are deleted afterwards.
+
+Requires a reachable Postgres configured through the usual POSTGRES_* variables.
+
+Usage:
+    python -m benchmarks.bulk_travel --batch 100 --repeat 3
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+import httpx
+from sqlmodel import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import async_engine, create_db_and_tables
+from app.main import app
+from app.models.travel import Travel
+from app.models.user import User
+from app.utils.auth_utils import auth_bearer
+
+TRAVEL = {
+    "origin": {"latitude": -8.1196, "longitude": -34.9010},
+    "destination": {"latitude": -8.0556, "longitude": -34.9516},
+    "days_of_week": ["monday", "wednesday"],
+    "price": 5.0,
+    "available_seats": 3,
+    "status": "open",
+    "start_time": "2030-01-01T07:30:00",
+    "description": "Carona para o CIn",
+}
+
+
+async def timed(label: str, batch: int, repeat: int, call):
+    # Best of `repeat` rounds, so one-off statement preparation is not measured
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await call()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<24} {best * 1000:9.1f} ms  {batch / best:10.1f} rides/s")
+    return best, result
+
+
+async def main(batch: int, repeat: int):
+    create_db_and_tables()
+    app.dependency_overrides[auth_bearer] = lambda: None
+
+    driver_id = str(uuid4())
+    driver = User(
+        id=driver_id,
+        name="Bench",
+        email="bench@cin.ufpe.br",
+        phone="+5581999999999",
+        photo="",
+        gender="",
+        score=5.0,
+    )
+    async with AsyncSession(async_engine) as session:
+        session.add(driver)
+        await session.commit()
+
+    body = dict(TRAVEL, id_driver=driver_id)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def create_single():
+                return [
+                    (await client.post("/travel/", json=body)).json()["id"] for _ in range(batch)
+                ]
+
+            async def create_bulk():
+                response = await client.post("/travel/bulk", json={"items": [body] * batch})
+                return [item["travel"]["id"] for item in response.json()["results"]]
+
+            single, ids = await timed("POST /travel x N", batch, repeat, create_single)
+            bulk, _ = await timed("POST /travel/bulk", batch, repeat, create_bulk)
+            print(f"{'create speedup':<24} {single / bulk:9.1f}x")
+
+            async def patch_single():
+                for travel_id in ids:
+                    await client.patch(f"/travel/{travel_id}", json={"price": 6.0})
+
+            async def patch_bulk():
+                items = [{"id": travel_id, "price": 7.0} for travel_id in ids]
+                await client.patch("/travel/bulk", json={"items": items})
+
+            single, _ = await timed("PATCH /travel/{id} x N", batch, repeat, patch_single)
+            bulk, _ = await timed("PATCH /travel/bulk", batch, repeat, patch_bulk)
+            print(f"{'patch speedup':<24} {single / bulk:9.1f}x")
+    finally:
+        async with AsyncSession(async_engine) as session:
+            await session.exec(delete(Travel).where(Travel.id_driver == driver_id))
+            await session.exec(delete(User).where(User.id == driver_id))
+            await session.commit()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch, args.repeat))
@@ -0,0 +1,69 @@
+"""
+Compare request throughput of sync Session handlers (run in the threadpool)
+against async AsyncSession handlers (run on the event loop).
+
+Requires a reachable Postgres configured through the usual POSTGRES_* variables.
+
+Usage:
+    python -m benchmarks.db_modes --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import async_engine, create_db_and_tables, get_async_session, get_session
+from app.models.user import User
+
+bench_app = FastAPI()
+
+
+@bench_app.get("/sync")
+def sync_users(session: Session = Depends(get_session)):
+    return session.exec(select(User).limit(20)).all()
+
+
+@bench_app.get("/async")
+async def async_users(session: AsyncSession = Depends(get_async_session)):
+    return (await session.exec(select(User).limit(20))).all()
+
+
+async def run(path: str, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=bench_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(total))
+
+        async def worker():
+            for _ in remaining:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+
+async def main(total: int, concurrency: int):
+    create_db_and_tables()
+    # Warm up both pools so connection setup is not measured
+    await run("/sync", concurrency, concurrency)
+    await run("/async", concurrency, concurrency)
+
+    for path in ("/sync", "/async"):
+        throughput = await run(path, total, concurrency)
+        print(f"{path:<8} {throughput:10.1f} req/s ({total} requests, concurrency {concurrency})")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,140 @@
+"""
+Measure the in-memory route matcher behind GET /travel/match on synthetic
+rides around Recife, and check its answers against a brute-force scan.
+No database is needed.
+
+Usage:
+    python -m benchmarks.route_matching --rides 100000 --queries 10000
+"""
+
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from app.utils.route_matching import METERS_PER_DEGREE, RouteMatcher, route_points
+from app.utils.utils import haversine_distances
+
+# Greater Recife, roughly
+MIN_LAT, MAX_LAT = -8.20, -7.90
+MIN_LON, MAX_LON = -35.05, -34.85
+
+
+def random_point(rng: random.Random):
+    return {"latitude": rng.uniform(MIN_LAT, MAX_LAT), "longitude": rng.uniform(MIN_LON, MAX_LON)}
+
+
+def make_route(rng: random.Random, waypoints: int):
+    # A wobbly path between two random points, like a street route
+    origin, destination = random_point(rng), random_point(rng)
+    path = []
+    for i in range(1, waypoints + 1):
+        t = i / (waypoints + 1)
+        path.append(
+            {
+                "latitude": origin["latitude"]
+                + t * (destination["latitude"] - origin["latitude"])
+                + rng.gauss(0, 0.002),
+                "longitude": origin["longitude"]
+                + t * (destination["longitude"] - origin["longitude"])
+                + rng.gauss(0, 0.002),
+            }
+        )
+    return route_points(origin, destination, path)
+
+
+def make_query(rng: random.Random, routes, radius: float):
+    # Most passengers ride along some existing route; the rest are random
+    if rng.random() < 0.8:
+        _, points = rng.choice(routes)
+        i, j = sorted(rng.sample(range(len(points)), 2))
+        jitter = radius / METERS_PER_DEGREE / 2
+        pickup = (points[i][0] + rng.uniform(-jitter, jitter), points[i][1])
+        dropoff = (points[j][0] + rng.uniform(-jitter, jitter), points[j][1])
+        return pickup, dropoff
+    pickup, dropoff = random_point(rng), random_point(rng)
+    return (pickup["latitude"], pickup["longitude"]), (dropoff["latitude"], dropoff["longitude"])
+
+
+class BruteForce:
+    """Every segment of every route in one array, scanned in full per query."""
+
+    def __init__(self, routes):
+        self.ids = [travel_id for travel_id, _ in routes]
+        coords = [np.asarray(points) for _, points in routes]
+        self.a = np.concatenate([points[:-1] for points in coords])
+        self.b = np.concatenate([points[1:] for points in coords])
+        lengths = haversine_distances(self.a[:, ::-1], self.b[:, ::-1])
+        self.owner = np.repeat(np.arange(len(coords)), [len(points) - 1 for points in coords])
+        # Distance along the route at the start of each segment
+        starts = np.r_[0, np.cumsum([len(points) - 1 for points in coords])[:-1]]
+        totals = np.r_[0, np.cumsum(lengths)]
+        self.along = totals[:-1] - totals[starts][self.owner]
+
+    def closest(self, point):
+        scale = np.array([METERS_PER_DEGREE, METERS_PER_DEGREE * math.cos(math.radians(point[0]))])
+        a = (self.a - point) * scale
+        ab = (self.b - self.a) * scale
+        length2 = np.einsum("ij,ij->i", ab, ab)
+        t = np.clip(-np.einsum("ij,ij->i", a, ab) / np.where(length2 > 0, length2, 1), 0, 1)
+        distances = np.hypot(*(a + t[:, None] * ab).T)
+        along = self.along + t * np.sqrt(length2)
+        # Closest segment of each route
+        order = np.lexsort((distances, self.owner))
+        first = order[np.flatnonzero(np.r_[True, np.diff(self.owner[order]) != 0])]
+        return distances[first], along[first]
+
+    def match(self, pickup, dropoff, radius: float):
+        p_distances, p_along = self.closest(pickup)
+        d_distances, d_along = self.closest(dropoff)
+        keep = (p_distances <= radius) & (d_distances <= radius) & (p_along <= d_along)
+        return {self.ids[i] for i in np.flatnonzero(keep)}
+
+
+def main(rides: int, queries: int, radius: float, waypoints: int, check: int, seed: int):
+    rng = random.Random(seed)
+    routes = [(str(i), make_route(rng, waypoints)) for i in range(rides)]
+    segments = sum(len(points) - 1 for _, points in routes)
+    print(f"{rides} rides, {segments / rides:.1f} segments per simplified route")
+
+    matcher = RouteMatcher()
+    start = time.perf_counter()
+    matcher.load(routes)
+    print(f"{'build':<12} {time.perf_counter() - start:9.2f} s")
+
+    batch = [make_query(rng, routes, radius) for _ in range(queries)]
+    latencies = []
+    found = 0
+    for pickup, dropoff in batch:
+        start = time.perf_counter()
+        found += len(matcher.match(pickup, dropoff, radius, limit=20))
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    total = sum(latencies)
+    print(f"{'queries/s':<12} {queries / total:9.0f}")
+    print(f"{'p50':<12} {latencies[len(latencies) // 2] * 1000:9.2f} ms")
+    print(f"{'p95':<12} {latencies[int(len(latencies) * 0.95)] * 1000:9.2f} ms")
+    print(f"{'matches':<12} {found / queries:9.1f} per query (limit 20)")
+
+    brute_force = BruteForce(routes)
+    start = time.perf_counter()
+    for pickup, dropoff in batch[:check]:
+        expected = brute_force.match(pickup, dropoff, radius)
+        got = {match.travel_id for match in matcher.match(pickup, dropoff, radius)}
+        assert got == expected, (pickup, dropoff, got ^ expected)
+    scan = (time.perf_counter() - start) / max(check, 1)
+    print(f"{'full scan':<12} {scan * 1000:9.2f} ms per query, same matches on {check} queries")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rides", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--radius", type=float, default=500)
+    parser.add_argument("--waypoints", type=int, default=20)
+    parser.add_argument("--check", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.rides, args.queries, args.radius, args.waypoints, args.check, args.seed)
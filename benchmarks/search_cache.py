@@ -0,0 +1,140 @@
+"""
+Compare repeated nearby GET /travel searches with and without the search
+result cache. Rows created here are deleted afterwards.
+
+Requires a reachable Postgres configured through the usual POSTGRES_* variables.
+
+Usage:
+    python -m benchmarks.search_cache --rides 2000 --searches 500
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import timedelta
+from uuid import uuid4
+
+import httpx
+from sqlmodel import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import app.routes.travel as travel_routes
+from app.database import async_engine, create_db_and_tables
+from app.main import app
+from app.models.travel import Travel
+from app.models.user import User
+from app.types.travel import utc_now
+from app.utils.auth_utils import auth_bearer
+
+CIN = (-8.0556, -34.9516)
+BOA_VIAGEM = (-8.1196, -34.9010)
+# cached_search arguments after radius, as GET /travel defaults them
+LIST_DEFAULTS = (None, None, None, 1, None, 20, None, None, 50.0, None)
+
+
+def jitter(rng: random.Random, point, degrees: float):
+    return {
+        "latitude": point[0] + rng.uniform(-degrees, degrees),
+        "longitude": point[1] + rng.uniform(-degrees, degrees),
+    }
+
+
+async def timed(label: str, client: httpx.AsyncClient, searches):
+    latencies = []
+    for params in searches:
+        start = time.perf_counter()
+        response = await client.get("/travel/", params=params)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    print(f"{label:<10} p50 {p50:7.2f} ms  p95 {p95:7.2f} ms")
+    return p50
+
+
+async def main(rides: int, searches: int, seed: int):
+    create_db_and_tables()
+    app.dependency_overrides[auth_bearer] = lambda: None
+    rng = random.Random(seed)
+
+    driver_id = str(uuid4())
+    driver = User(
+        id=driver_id,
+        name="Bench",
+        email="bench@cin.ufpe.br",
+        phone="+5581999999999",
+        photo="",
+        gender="",
+        score=5.0,
+    )
+    async with AsyncSession(async_engine) as session:
+        session.add(driver)
+        await session.commit()
+
+    now = utc_now()
+    items = [
+        {
+            "id_driver": driver_id,
+            "origin": jitter(rng, BOA_VIAGEM, 0.02),
+            "destination": jitter(rng, CIN, 0.005),
+            "days_of_week": rng.choice([None, ["monday", "wednesday"]]),
+            "price": 5.0,
+            "available_seats": 3,
+            "status": "open",
+            "start_time": (now + timedelta(minutes=rng.randint(10, 20000))).isoformat(),
+            "description": "Carona para o CIn",
+        }
+        for _ in range(rides)
+    ]
+    # Passengers around the same few blocks, searching over and over
+    params = [
+        {
+            **{f"origin_{key}": value for key, value in jitter(rng, BOA_VIAGEM, 0.002).items()},
+            **{f"destination_{key}": value for key, value in jitter(rng, CIN, 0.001).items()},
+            "radius": 1000,
+        }
+        for _ in range(searches)
+    ]
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for offset in range(0, rides, 500):
+                await client.post("/travel/bulk", json={"items": items[offset : offset + 500]})
+
+            travel_routes.SEARCH_CACHE_ENABLED = False
+            uncached = await timed("uncached", client, params)
+            travel_routes.SEARCH_CACHE_ENABLED = True
+            await timed("cold", client, params)
+            cached = await timed("cached", client, params)
+            print(f"{'speedup':<10} {uncached / cached:7.1f}x (p50, includes ASGI overhead)")
+
+        # The cache hit itself, without the HTTP stack around it
+        latencies = []
+        async with AsyncSession(async_engine) as session:
+            for search in params:
+                start = time.perf_counter()
+                response = await travel_routes.cached_search(
+                    session, *search.values(), *LIST_DEFAULTS
+                )
+                latencies.append(time.perf_counter() - start)
+                assert response is not None
+        latencies.sort()
+        print(f"{'lookup':<10} p50 {latencies[len(latencies) // 2] * 1000:7.2f} ms")
+    finally:
+        async with AsyncSession(async_engine) as session:
+            await session.exec(delete(Travel).where(Travel.id_driver == driver_id))
+            await session.exec(delete(User).where(User.id == driver_id))
+            await session.commit()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rides", type=int, default=2000)
+    parser.add_argument("--searches", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.rides, args.searches, args.seed))
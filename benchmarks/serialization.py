@@ -0,0 +1,99 @@
+"""
+Compare the old search serialization path (model_dump dicts encoded by
+FastAPI's jsonable_encoder) with ModelResponse over pydantic response
+models validated straight from ORM objects. No database is needed.
+
+Usage:
+    python -m benchmarks.serialization --rows 10000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models.travel import Travel
+from app.models.user import User
+from app.types.pagination import Page
+from app.types.travel import TravelSearchResult
+from app.utils.responses import ModelResponse
+
+
+def make_rows(count: int):
+    driver = User(
+        id=str(uuid4()),
+        name="Driver",
+        email="driver@cin.ufpe.br",
+        phone="+5581999999999",
+        photo="",
+        gender="",
+        score=5.0,
+    )
+    start = datetime(2030, 1, 1, 7, 30)
+    return [
+        (
+            Travel(
+                id=str(uuid4()),
+                id_driver=driver.id,
+                origin={"latitude": -8.1196 + i * 1e-6, "longitude": -34.9010},
+                destination={"latitude": -8.0556, "longitude": -34.9516},
+                days_of_week=["monday", "wednesday"],
+                price=5.0,
+                available_seats=3,
+                status="open",
+                description="Carona para o CIn",
+                start_time=start + timedelta(minutes=i),
+            ),
+            driver,
+        )
+        for i in range(count)
+    ]
+
+
+def dict_path(rows) -> bytes:
+    items = []
+    for travel, user in rows:
+        travel_data = travel.model_dump()
+        travel_data["driver_name"] = user.name
+        travel_data["driver_phone"] = user.phone
+        items.append(travel_data)
+    return JSONResponse(jsonable_encoder({"items": items, "next_cursor": None})).body
+
+
+def model_path(rows) -> bytes:
+    items = []
+    for travel, user in rows:
+        item = TravelSearchResult.model_validate(travel)
+        item.driver_name = user.name
+        item.driver_phone = user.phone
+        items.append(item)
+    return ModelResponse(Page[TravelSearchResult](items=items)).body
+
+
+def measure(label: str, serialize, rows, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = serialize(rows)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<28} {best * 1000:9.1f} ms  ({len(body) / 1024:.0f} KiB)")
+    return body
+
+
+def main(count: int, repeat: int):
+    rows = make_rows(count)
+    old = measure("model_dump + jsonable_encoder", dict_path, rows, repeat)
+    new = measure("model_validate + ModelResponse", model_path, rows, repeat)
+    assert len(json.loads(old)["items"]) == len(json.loads(new)["items"]) == count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
@@ -0,0 +1,175 @@
+import json
+
+import rsa
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+from jose.backends import RSAKey
+
+from app.types.auth import JWTAuthCredentials
+from app.utils.auth_utils import JWKSCache, SecretCache, TokenCache, fetch_auth_secrets
+
+
+class StubSecretsManager:
+    def __init__(self):
+        self.calls = 0
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        return {"SecretString": json.dumps({"client_id": f"client-{self.calls}"})}
+
+
+def make_cache(client, clock):
+    return SecretCache(lambda: fetch_auth_secrets(client), ttl=100, stale_ttl=50, clock=clock)
+
+
+def test_secret_cache_serves_fresh_value_without_calls(clock):
+    client = StubSecretsManager()
+    cache = make_cache(client, clock)
+
+    for _ in range(10):
+        assert cache.get() == {"client_id": "client-1"}
+        clock.now += 5
+
+    assert client.calls == 1
+
+
+def test_secret_cache_serves_stale_value_while_refreshing(clock):
+    client = StubSecretsManager()
+    cache = make_cache(client, clock)
+    cache.get()
+
+    clock.now = 120
+    assert cache.get() == {"client_id": "client-1"}
+    cache._refresh_thread.join()
+
+    assert client.calls == 2
+    assert cache.get() == {"client_id": "client-2"}
+
+
+def test_secret_cache_reloads_when_too_stale(clock):
+    client = StubSecretsManager()
+    cache = make_cache(client, clock)
+    cache.get()
+
+    clock.now = 200
+    assert cache.get() == {"client_id": "client-2"}
+    assert client.calls == 2
+
+
+def test_secret_cache_backs_off_after_failed_refresh(clock):
+    client = StubSecretsManager()
+    outage = True
+
+    def loader():
+        if outage and client.calls:
+            client.calls += 1
+            raise ClientError({"Error": {"Code": "ServiceUnavailable"}}, "GetSecretValue")
+        return fetch_auth_secrets(client)
+
+    cache = SecretCache(loader, ttl=100, stale_ttl=50, retry_interval=30, clock=clock)
+    cache.get()
+
+    # Past refresh_after, every request would start a refresh without the back-off
+    for now in (90, 95, 100, 119):
+        clock.now = now
+        assert cache.get() == {"client_id": "client-1"}
+        cache._refresh_thread.join()
+    assert client.calls == 2
+
+    outage = False
+    clock.now = 120
+    cache.get()
+    cache._refresh_thread.join()
+    assert cache.get() == {"client_id": "client-3"}
+
+
+def make_jwk(kid):
+    _, private_key = rsa.newkeys(512)
+    public_jwk = RSAKey(private_key.save_pkcs1().decode(), "RS256").public_key().to_dict()
+    return {**public_jwk, "kid": kid}
+
+
+class StubJWKSEndpoint:
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"keys": self.keys}
+
+
+def test_jwks_cache_constructs_keys_once(clock):
+    endpoint = StubJWKSEndpoint(make_jwk("k1"))
+    cache = JWKSCache(endpoint, ttl=3600, min_refresh_interval=30, clock=clock)
+
+    first = cache.get_key("k1")
+    clock.now += 60
+    assert cache.get_key("k1") is first
+    assert endpoint.calls == 1
+
+
+def test_jwks_cache_refreshes_on_unknown_kid_with_rate_limit(clock):
+    endpoint = StubJWKSEndpoint(make_jwk("k1"))
+    cache = JWKSCache(endpoint, ttl=3600, min_refresh_interval=30, clock=clock)
+    cache.get_key("k1")
+
+    endpoint.keys.append(make_jwk("k2"))
+    clock.now += 10
+    assert cache.get_key("k2") is None
+    assert endpoint.calls == 1
+
+    clock.now += 30
+    assert cache.get_key("k2") is not None
+    assert endpoint.calls == 2
+
+
+def test_jwks_cache_rate_limits_refreshes_during_an_outage(clock):
+    endpoint = StubJWKSEndpoint(make_jwk("k1"))
+    cache = JWKSCache(endpoint, ttl=3600, min_refresh_interval=30, clock=clock)
+    first = cache.get_key("k1")
+
+    def outage():
+        endpoint.calls += 1
+        raise HTTPException(status_code=500, detail="JWKS unavailable")
+
+    cache.loader = outage
+    clock.now = 3600
+    for _ in range(10):
+        assert cache.get_key("k1") is first
+        assert cache.get_key("unknown") is None
+        clock.now += 1
+    assert endpoint.calls == 2
+
+    cache.loader = endpoint
+    clock.now = 3630
+    assert cache.get_key("k1") is not first
+    assert endpoint.calls == 3
+
+
+def make_credentials(token):
+    return JWTAuthCredentials(jwt_token=token, header={}, claims={}, sig="sig", message="message")
+
+
+def test_token_cache_expires_entries_at_exp(clock):
+    cache = TokenCache(maxsize=10, clock=clock)
+    cache.put("token", make_credentials("token"), expires_at=100)
+
+    clock.now = 99
+    assert cache.get("token").jwt_token == "token"
+    clock.now = 100
+    assert cache.get("token") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_token_cache_evicts_least_recently_used(clock):
+    cache = TokenCache(maxsize=2, clock=clock)
+    for token in ("a", "b"):
+        cache.put(token, make_credentials(token), expires_at=100)
+
+    cache.get("a")
+    cache.put("c", make_credentials("c"), expires_at=100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
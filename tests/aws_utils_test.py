@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.aws_utils import BoundedExecutor
+
+
+def test_bounded_executor_runs_call_off_the_loop():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=4, timeout=1)
+    loop_thread = threading.get_ident()
+
+    result = asyncio.run(executor.run(lambda value: (value, threading.get_ident()), "ok"))
+
+    assert result[0] == "ok"
+    assert result[1] != loop_thread
+    executor.shutdown()
+
+
+def test_bounded_executor_times_out_slow_calls():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=4, timeout=0.05)
+    release = threading.Event()
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(executor.run(release.wait, 5))
+
+    assert error.value.status_code == 504
+    release.set()
+    executor.shutdown()
+
+
+def test_bounded_executor_rejects_when_queue_is_full():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=1, timeout=1)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    async def scenario():
+        running = asyncio.create_task(executor.run(block))
+        await asyncio.to_thread(started.wait, 1)
+        queued = asyncio.create_task(executor.run(lambda: "queued"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException) as error:
+            await executor.run(lambda: None)
+
+        release.set()
+        await running
+        assert await queued == "queued"
+        return error.value.status_code
+
+    assert asyncio.run(scenario()) == 503
+    executor.shutdown()
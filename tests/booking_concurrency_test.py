@@ -0,0 +1,86 @@
+import asyncio
+import os
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+# Needs a disposable Postgres configured through the POSTGRES_* variables
+pytestmark = pytest.mark.skipif(
+    not os.getenv("POSTGRES_HOST"), reason="requires a local Postgres (POSTGRES_HOST)"
+)
+
+SEATS = 25
+BOOKINGS = 300
+
+
+async def book_concurrently():
+    import httpx
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from app.database import async_engine, create_db_and_tables
+    from app.main import app
+    from app.models.travel import Travel
+    from app.models.user import User
+    from app.types.auth import JWTAuthCredentials
+    from app.utils.auth_utils import auth_bearer
+
+    create_db_and_tables()
+    app.dependency_overrides[auth_bearer] = lambda: JWTAuthCredentials(
+        jwt_token="token", header={}, claims={}, sig="sig", message="message"
+    )
+
+    driver = User(
+        id=str(uuid4()),
+        name="Driver",
+        email=f"{uuid4()}@cin.ufpe.br",
+        phone="+5581999999999",
+        photo="",
+        gender="",
+        score=5.0,
+    )
+    travel = Travel(
+        id=str(uuid4()),
+        id_driver=driver.id,
+        origin={"latitude": -8.1196, "longitude": -34.9010},
+        destination={"latitude": -8.0556, "longitude": -34.9516},
+        days_of_week=[],
+        price=5.0,
+        available_seats=SEATS,
+        status="open",
+        description="",
+        start_time=datetime(2030, 1, 1, 7, 30),
+    )
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        session.add(driver)
+        await session.commit()
+        session.add(travel)
+        await session.commit()
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(
+                *(client.post(f"/travel/{travel.id}/book") for _ in range(BOOKINGS))
+            )
+
+        async with AsyncSession(async_engine) as session:
+            booked = await session.get(Travel, travel.id)
+            final_state = (booked.available_seats, booked.status)
+            await session.delete(booked)
+            await session.delete(await session.get(User, driver.id))
+            await session.commit()
+    finally:
+        app.dependency_overrides.clear()
+        await async_engine.dispose()
+
+    return [response.status_code for response in responses], final_state
+
+
+def test_concurrent_bookings_never_oversell():
+    status_codes, (available_seats, status) = asyncio.run(book_concurrently())
+
+    assert status_codes.count(200) == SEATS
+    assert status_codes.count(409) == BOOKINGS - SEATS
+    assert available_seats == 0
+    assert status == "full"
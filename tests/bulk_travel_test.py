@@ -0,0 +1,142 @@
+import asyncio
+import os
+from uuid import uuid4
+
+import pytest
+
+# Needs a disposable Postgres configured through the POSTGRES_* variables
+pytestmark = pytest.mark.skipif(
+    not os.getenv("POSTGRES_HOST"), reason="requires a local Postgres (POSTGRES_HOST)"
+)
+
+BOA_VIAGEM = {"latitude": -8.1196, "longitude": -34.9010}
+CIN = {"latitude": -8.0556, "longitude": -34.9516}
+OLINDA = {"latitude": -8.0089, "longitude": -34.8553}
+
+
+def travel_item(driver_id, **fields):
+    return {
+        "id_driver": driver_id,
+        "origin": BOA_VIAGEM,
+        "destination": CIN,
+        "days_of_week": None,
+        "price": 5.0,
+        "available_seats": 3,
+        "status": "open",
+        "description": "",
+        "start_time": "2030-01-01T07:30:00",
+        **fields,
+    }
+
+
+async def bulk_writes():
+    import httpx
+    from sqlmodel import delete, select
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from app.database import async_engine, create_db_and_tables
+    from app.main import app
+    from app.models.travel import Travel
+    from app.models.user import User
+    from app.utils.auth_utils import auth_bearer
+    from app.utils.query_stats import count_queries
+
+    create_db_and_tables()
+    app.dependency_overrides[auth_bearer] = lambda: None
+
+    driver = User(
+        id=str(uuid4()),
+        name="Driver",
+        email=f"{uuid4()}@cin.ufpe.br",
+        phone="+5581999999999",
+        photo="",
+        gender="",
+        score=5.0,
+    )
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        session.add(driver)
+        await session.commit()
+
+    outcome = {}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/travel/bulk",
+                json={
+                    "items": [
+                        travel_item(driver.id),
+                        travel_item("nobody"),
+                        travel_item(driver.id, origin=OLINDA, description="second"),
+                        travel_item(driver.id, description="third"),
+                    ]
+                },
+            )
+            created = response.json()["results"]
+            outcome["create"] = [(result["index"], result["status_code"]) for result in created]
+            first, second, third = (created[i]["travel"]["id"] for i in (0, 2, 3))
+
+            with count_queries() as queries:
+                response = await client.patch(
+                    "/travel/bulk",
+                    json={
+                        "items": [
+                            {"id": first, "price": 7.0},
+                            {"id": second, "price": 8.0},
+                            {"id": "missing", "price": 1.0},
+                            # Listed twice with the same fields: the last patch wins
+                            {"id": first, "price": 9.0},
+                            # Only one endpoint changes: rerouted from the stored destination
+                            {"id": second, "origin": BOA_VIAGEM},
+                            {"id": third, "available_seats": 1, "description": "patched"},
+                        ]
+                    },
+                )
+            outcome["update"] = [
+                (result["index"], result["status_code"]) for result in response.json()["results"]
+            ]
+            outcome["updates"] = [
+                statement
+                for statement in queries.statements
+                if statement.lstrip().startswith("UPDATE")
+            ]
+
+        async with AsyncSession(async_engine) as session:
+            rows = await session.exec(select(Travel).where(Travel.id_driver == driver.id))
+            outcome["rows"] = {travel.id: travel.model_dump() for travel in rows}
+            outcome["ids"] = first, second, third
+    finally:
+        app.dependency_overrides.clear()
+        async with AsyncSession(async_engine) as session:
+            await session.exec(delete(Travel).where(Travel.id_driver == driver.id))
+            await session.delete(await session.get(User, driver.id))
+            await session.commit()
+        await async_engine.dispose()
+
+    return outcome
+
+
+def test_bulk_create_and_update_report_each_item_and_store_the_rows():
+    outcome = asyncio.run(bulk_writes())
+    first, second, third = (outcome["rows"][travel_id] for travel_id in outcome["ids"])
+
+    assert outcome["create"] == [(0, 201), (1, 404), (2, 201), (3, 201)]
+    assert len(outcome["rows"]) == 3
+
+    assert outcome["update"] == [(0, 200), (1, 200), (2, 404), (3, 200), (4, 200), (5, 200)]
+    # One UPDATE ... FROM (VALUES ...) per distinct set of fields, plus the reroute
+    assert len(outcome["updates"]) == 4
+    assert all("FROM (VALUES" in statement for statement in outcome["updates"])
+
+    assert first["price"] == 9.0
+    assert (second["price"], second["origin"]) == (8.0, BOA_VIAGEM)
+    assert (second["origin_latitude"], second["origin_longitude"]) == (
+        BOA_VIAGEM["latitude"],
+        BOA_VIAGEM["longitude"],
+    )
+    assert second["route"] == [BOA_VIAGEM, CIN]
+    assert (third["available_seats"], third["description"], third["price"]) == (
+        1,
+        "patched",
+        5.0,
+    )
@@ -0,0 +1,68 @@
+import asyncio
+
+from app.utils.cache_utils import MemoryCacheBackend, ReadThroughCache
+
+
+def test_memory_backend_expires_and_evicts(clock):
+    backend = MemoryCacheBackend(max_entries=2, clock=clock)
+
+    async def scenario():
+        await backend.set("a", b"1", ttl=10)
+        await backend.set("b", b"2", ttl=10)
+        await backend.get("a")
+        await backend.set("c", b"3", ttl=10)
+        assert await backend.get("b") is None
+        assert await backend.get("a") == b"1"
+
+        clock.now = 11
+        assert await backend.get("a") is None
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_load():
+    cache = ReadThroughCache(MemoryCacheBackend(), ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b"value"
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(20)))
+        assert results == [b"value"] * 20
+        assert await cache.get_or_load("k", loader) == b"value"
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+
+
+def test_invalidation_during_load_is_not_overwritten():
+    cache = ReadThroughCache(MemoryCacheBackend(), ttl=60)
+
+    async def scenario():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def stale_loader():
+            started.set()
+            await release.wait()
+            return b"stale"
+
+        async def fresh_loader():
+            return b"fresh"
+
+        load = asyncio.create_task(cache.get_or_load("k", stale_loader))
+        await started.wait()
+        await cache.invalidate("k")
+        # A read after the write does not join the load that started before it
+        fresh = cache.get_or_load("k", fresh_loader)
+        assert await asyncio.wait_for(fresh, timeout=1) == b"fresh"
+
+        release.set()
+        assert await load == b"stale"
+        assert await cache.backend.get("k") == b"fresh"
+
+    asyncio.run(scenario())
+    assert not cache._inflight
@@ -0,0 +1,15 @@
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """A clock for the caches that only moves when a test sets clock.now."""
+    return FakeClock()
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.etags import check_if_match, collection_etag, entity_etag, etag_matches
+
+UPDATED = datetime(2026, 1, 1, 12, 0)
+
+
+def test_entity_etag_changes_with_row_version():
+    etag = entity_etag("a", UPDATED)
+
+    assert etag == entity_etag("a", UPDATED)
+    assert etag != entity_etag("a", datetime(2026, 1, 1, 12, 1))
+    assert etag.startswith('"') and etag.endswith('"')
+
+
+def test_collection_etag_depends_on_rows_and_cursor():
+    rows = [("a", UPDATED), ("b", UPDATED)]
+
+    assert collection_etag(rows) != collection_etag(rows[:1])
+    assert collection_etag(rows) != collection_etag(rows, "next")
+    assert collection_etag(rows) != collection_etag(list(reversed(rows)))
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = entity_etag("a", UPDATED)
+
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(f"W/{etag}", etag, weak=False)
+
+
+def test_if_match_mismatch_is_412():
+    etag = entity_etag("a", UPDATED)
+
+    check_if_match(None, etag)
+    check_if_match(etag, etag)
+    with pytest.raises(HTTPException) as error:
+        check_if_match('"stale"', etag)
+    assert error.value.status_code == 412
@@ -0,0 +1,157 @@
+import asyncio
+import os
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from app.utils.occurrences import (
+    expand_occurrences,
+    nearest_departure,
+    parse_days_of_week,
+    parse_weekday,
+)
+
+WINDOW_START = datetime(2026, 10, 19)  # a Monday
+WINDOW_END = datetime(2026, 11, 2)
+
+
+@pytest.mark.parametrize(
+    "value, weekday",
+    [
+        ("monday", 0),
+        ("Tue", 1),
+        ("Quarta-feira", 2),
+        ("terça", 1),
+        ("Sáb.", 5),
+        ("dom", 6),
+        ("0", 6),
+        ("7", 6),
+        ("1", 0),
+        ("someday", None),
+        ("9", None),
+    ],
+)
+def test_parse_weekday_accepts_names_abbreviations_and_numbers(value, weekday):
+    assert parse_weekday(value) == weekday
+
+
+def test_one_off_travel_departs_once():
+    start = datetime(2026, 10, 21, 7, 30)
+
+    assert expand_occurrences(start, None, WINDOW_START, WINDOW_END) == [start]
+    assert expand_occurrences(start, [], WINDOW_END, datetime(2026, 12, 1)) == []
+
+
+def test_recurring_travel_repeats_at_start_time_inside_window():
+    start = datetime(2026, 10, 1, 7, 30)
+
+    departures = expand_occurrences(start, ["seg", "friday"], WINDOW_START, WINDOW_END)
+
+    assert departures == [
+        datetime(2026, 10, 19, 7, 30),
+        datetime(2026, 10, 23, 7, 30),
+        datetime(2026, 10, 26, 7, 30),
+        datetime(2026, 10, 30, 7, 30),
+    ]
+    assert parse_days_of_week(["seg", "friday", "bogus"]) == {0, 4}
+
+
+def test_recurring_travel_does_not_depart_before_its_start_time():
+    start = datetime(2026, 10, 26, 7, 30)
+
+    departures = expand_occurrences(start, ["monday"], WINDOW_START, WINDOW_END)
+
+    assert departures == [start]
+
+
+def test_nearest_departure_picks_closest_recurring_day():
+    start = datetime(2026, 10, 5, 7, 30)  # a Monday
+
+    # Thursday evening: Friday morning is closer than the Monday before
+    target = datetime(2026, 10, 22, 20, 0)
+
+    assert nearest_departure(start, ["mon", "fri"], target) == datetime(2026, 10, 23, 7, 30)
+    assert nearest_departure(start, None, target) == start
+
+
+async def refreshed_departures():
+    from sqlmodel import delete, select
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from app.database import async_engine, create_db_and_tables
+    from app.models.travel import Travel, TravelOccurrence
+    from app.models.user import User
+    from app.utils.occurrences import refresh_occurrences
+
+    create_db_and_tables()
+    driver = User(
+        id=str(uuid4()),
+        name="Driver",
+        email=f"{uuid4()}@cin.ufpe.br",
+        phone="+5581999999999",
+        photo="",
+        gender="",
+        score=5.0,
+    )
+    schedules = {
+        "past one-off": (datetime(2026, 10, 1, 7, 30), None),
+        "past, no days": (datetime(2026, 10, 1, 7, 30), []),
+        "upcoming one-off": (datetime(2026, 10, 21, 7, 30), None),
+        "recurring": (datetime(2026, 10, 1, 7, 30), ["monday"]),
+    }
+    travels = {
+        name: Travel(
+            id=str(uuid4()),
+            id_driver=driver.id,
+            origin={"latitude": -8.1196, "longitude": -34.9010},
+            destination={"latitude": -8.0556, "longitude": -34.9516},
+            days_of_week=days_of_week,
+            price=5.0,
+            available_seats=3,
+            status="open",
+            description="",
+            start_time=start_time,
+        )
+        for name, (start_time, days_of_week) in schedules.items()
+    }
+    try:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            session.add(driver)
+            await session.commit()
+            session.add_all(travels.values())
+            await session.commit()
+
+            await refresh_occurrences(session, now=WINDOW_START)
+            await session.commit()
+            rows = await session.exec(
+                select(TravelOccurrence.travel_id, TravelOccurrence.departs_at).where(
+                    TravelOccurrence.travel_id.in_([travel.id for travel in travels.values()])
+                )
+            )
+            names = {travel.id: name for name, travel in travels.items()}
+            departures = {}
+            for travel_id, departs_at in rows:
+                departures.setdefault(names[travel_id], []).append(departs_at)
+    finally:
+        async with AsyncSession(async_engine) as session:
+            await session.exec(delete(Travel).where(Travel.id_driver == driver.id))
+            await session.delete(await session.get(User, driver.id))
+            await session.commit()
+        await async_engine.dispose()
+
+    return {name: sorted(times) for name, times in departures.items()}
+
+
+@pytest.mark.skipif(
+    not os.getenv("POSTGRES_HOST"), reason="requires a local Postgres (POSTGRES_HOST)"
+)
+def test_refresh_materializes_recurring_and_upcoming_travels():
+    departures = asyncio.run(refreshed_departures())
+
+    assert departures.keys() == {"upcoming one-off", "recurring"}
+    assert departures["upcoming one-off"] == [datetime(2026, 10, 21, 7, 30)]
+    assert departures["recurring"][:2] == [
+        datetime(2026, 10, 19, 7, 30),
+        datetime(2026, 10, 26, 7, 30),
+    ]
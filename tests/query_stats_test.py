@@ -0,0 +1,158 @@
+import asyncio
+import os
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from app.utils.query_stats import QueryStatsMiddleware, count_queries, instrument_queries
+
+
+def test_count_queries_counts_statements_inside_the_block():
+    engine = create_engine("sqlite://")
+    instrument_queries(engine)
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        with count_queries() as outer:
+            connection.execute(text("SELECT 2"))
+            with count_queries() as inner:
+                connection.execute(text("SELECT 3"))
+        connection.execute(text("SELECT 4"))
+
+    assert outer.statements == ["SELECT 2", "SELECT 3"]
+    assert inner.count == 1
+    assert 0 < inner.slowest_duration <= inner.duration <= outer.duration
+
+
+def test_middleware_exports_queries_per_route():
+    import httpx
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+
+    engine = create_engine("sqlite://")
+    instrument_queries(engine)
+
+    async def rides(request):
+        with engine.connect() as connection:
+            for _ in range(3):
+                connection.execute(text("SELECT 1"))
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/rides/{ride_id}", rides)])
+    app.add_middleware(QueryStatsMiddleware, server_timing=True, slow_query_ms=0)
+    labels = {"method": "GET", "path_template": "/rides/{ride_id}"}
+    before = REGISTRY.get_sample_value("db_request_queries_sum", labels) or 0
+
+    async def get():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/rides/42")
+
+    response = asyncio.run(get())
+
+    assert 'desc="3 queries"' in response.headers["Server-Timing"]
+    assert "db-slowest;dur=" in response.headers["Server-Timing"]
+    assert REGISTRY.get_sample_value("db_request_queries_sum", labels) - before == 3
+
+
+async def travel_write_counts():
+    import httpx
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from app.database import async_engine, create_db_and_tables
+    from app.main import app
+    from app.models.user import User
+    from app.utils.auth_utils import auth_bearer
+
+    create_db_and_tables()
+    app.dependency_overrides[auth_bearer] = lambda: None
+
+    driver = User(
+        id=str(uuid4()),
+        name="Driver",
+        email=f"{uuid4()}@cin.ufpe.br",
+        phone="+5581999999999",
+        photo="",
+        gender="",
+        score=5.0,
+    )
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        session.add(driver)
+        await session.commit()
+
+    travel = {
+        "id_driver": driver.id,
+        "origin": {"latitude": -8.1196, "longitude": -34.9010},
+        "destination": {"latitude": -8.0556, "longitude": -34.9516},
+        "days_of_week": [],
+        "price": 5.0,
+        "available_seats": 3,
+        "status": "open",
+        "description": "",
+        # Outside the occurrence window, so creating it writes no occurrences
+        "start_time": datetime(2030, 1, 1, 7, 30).isoformat(),
+    }
+    counts = {}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with count_queries() as queries:
+                response = await client.post("/travel/", json=travel)
+            assert response.status_code == 201, response.text
+            travel_id = response.json()["id"]
+            counts["create"] = queries.count
+
+            with count_queries() as queries:
+                response = await client.post("/travel/", json={**travel, "id_driver": "nobody"})
+            assert response.status_code == 404
+            counts["create unknown driver"] = queries.count
+
+            with count_queries() as queries:
+                response = await client.patch(f"/travel/{travel_id}", json={"price": 7.5})
+            assert response.json()["price"] == 7.5
+            counts["update"] = queries.count
+
+            with count_queries() as queries:
+                response = await client.patch(
+                    f"/travel/{travel_id}",
+                    json={"price": 8.0},
+                    headers={"If-Match": response.headers["ETag"]},
+                )
+            assert response.status_code == 200
+            counts["update if-match"] = queries.count
+
+            with count_queries() as queries:
+                response = await client.delete(f"/travel/{travel_id}")
+            assert response.status_code == 200
+            counts["delete"] = queries.count
+
+            with count_queries() as queries:
+                response = await client.delete(f"/travel/{travel_id}")
+            assert response.status_code == 404
+            counts["delete missing"] = queries.count
+    finally:
+        app.dependency_overrides.clear()
+        async with AsyncSession(async_engine) as session:
+            await session.delete(await session.get(User, driver.id))
+            await session.commit()
+        await async_engine.dispose()
+
+    return counts
+
+
+@pytest.mark.skipif(
+    not os.getenv("POSTGRES_HOST"), reason="requires a local Postgres (POSTGRES_HOST)"
+)
+def test_travel_writes_take_one_statement():
+    assert asyncio.run(travel_write_counts()) == {
+        "create": 1,
+        "create unknown driver": 1,
+        "update": 1,
+        "update if-match": 2,
+        "delete": 1,
+        "delete missing": 1,
+    }
@@ -0,0 +1,88 @@
+from app.utils import route_matching
+from app.utils.route_matching import RouteMatcher, route_points, segment_cells, simplify_polyline
+
+ORIGIN = {"latitude": -8.00, "longitude": -34.90}
+DESTINATION = {"latitude": -8.05, "longitude": -34.95}
+# South along the longitude, then west
+CORNER = {"latitude": -8.05, "longitude": -34.90}
+
+
+def test_simplify_drops_points_close_to_the_line():
+    points = [(0.0, 0.0), (0.00001, 0.005), (0.0, 0.01), (0.01, 0.01)]
+    assert simplify_polyline(points, tolerance=30) == [(0.0, 0.0), (0.0, 0.01), (0.01, 0.01)]
+
+
+def test_segment_cells_follow_the_segment():
+    cells = segment_cells((0.005, 0.005), (0.025, 0.015), 0.01)
+    assert cells[0] == (0, 0) and cells[-1] == (2, 1)
+    assert all(abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1 for a, b in zip(cells, cells[1:]))
+
+
+def test_match_respects_direction_and_removal():
+    matcher = RouteMatcher()
+    matcher.load(
+        [
+            ("l", route_points(ORIGIN, DESTINATION, [CORNER])),
+            ("straight", route_points(ORIGIN, DESTINATION)),
+        ]
+    )
+    pickup, dropoff = (-8.03, -34.9005), (-8.0505, -34.93)
+
+    matches = matcher.match(pickup, dropoff, radius=300)
+    assert [match.travel_id for match in matches] == ["l"]
+    assert 50 < matches[0].pickup_distance < 60
+    assert matches[0].detour == 2 * (matches[0].pickup_distance + matches[0].dropoff_distance)
+
+    assert matcher.match(dropoff, pickup, radius=300) == []
+
+    matcher.remove("l")
+    assert matcher.match(pickup, dropoff, radius=300) == []
+
+
+def test_match_with_a_huge_radius_walks_the_occupied_cells():
+    matcher = RouteMatcher()
+    matcher.load(
+        [
+            ("l", route_points(ORIGIN, DESTINATION, [CORNER])),
+            ("straight", route_points(ORIGIN, DESTINATION)),
+        ]
+    )
+    pickup, dropoff = (-8.03, -34.9005), (-8.0505, -34.93)
+
+    # Millions of cells in the bounding box, a handful occupied
+    matches = matcher.match(pickup, dropoff, radius=2_000_000)
+    assert sorted(match.travel_id for match in matches) == ["l", "straight"]
+
+
+def test_writes_are_ignored_until_the_matcher_is_loaded():
+    matcher = RouteMatcher()
+    matcher.add("l", route_points(ORIGIN, DESTINATION, [CORNER]))
+    matcher.add_many([("straight", route_points(ORIGIN, DESTINATION))])
+    assert not matcher._grid.routes
+
+
+def test_compaction_runs_outside_the_lock_and_keeps_writes_made_meanwhile(monkeypatch):
+    matcher = RouteMatcher()
+    matcher.load([(str(i), route_points(ORIGIN, DESTINATION)) for i in range(1100)])
+    lock_held = []
+
+    class Grid(route_matching.SegmentGrid):
+        def add(self, travel_id, points):
+            super().add(travel_id, points)
+            if not lock_held:
+                # A write and a match arriving while the compacted grid is built
+                lock_held.append(matcher._lock.locked())
+                matcher.add("l", route_points(ORIGIN, DESTINATION, [CORNER]))
+                matcher.remove("1099")
+                matcher.match((-8.03, -34.9005), (-8.0505, -34.93), radius=300)
+
+    monkeypatch.setattr(route_matching, "SegmentGrid", Grid)
+    # Compacts on the 1025th removal
+    for i in range(1030):
+        matcher.remove(str(i))
+
+    assert lock_held == [False]
+    assert isinstance(matcher._grid, Grid) and matcher._pending is None
+    assert set(matcher._grid.routes) == {str(i) for i in range(1030, 1099)} | {"l"}
+    matches = matcher.match((-8.03, -34.9005), (-8.0505, -34.93), radius=300)
+    assert [match.travel_id for match in matches] == ["l"]
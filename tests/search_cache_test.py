@@ -0,0 +1,203 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+from app.types.travel import utc_now
+from app.utils.cache_utils import MemoryCacheBackend
+from app.utils.occurrences import departs_between
+from app.utils.search_cache import (
+    TOO_MANY,
+    SearchCache,
+    ceil_time,
+    floor_time,
+    pack_candidates,
+    radius_bucket,
+)
+
+CIN = (-8.0556, -34.9516)
+BOA_VIAGEM = (-8.1196, -34.9010)
+NOW = datetime(2026, 10, 19, 7, 30, 25)
+
+
+def area(cache, origin=BOA_VIAGEM, radius=800):
+    return cache.area(origin, CIN, radius, NOW, None, None, 1)
+
+
+def test_radius_and_time_are_bucketed():
+    assert [radius_bucket(radius) for radius in (1, 250, 251, 1000, 4000)] == [
+        250,
+        250,
+        500,
+        1000,
+        4000,
+    ]
+    assert radius_bucket(4001) is None
+    assert floor_time(NOW, 60) == datetime(2026, 10, 19, 7, 30)
+    assert ceil_time(NOW, 60) == datetime(2026, 10, 19, 7, 31)
+    assert ceil_time(datetime(2026, 10, 19, 7, 30), 60) == datetime(2026, 10, 19, 7, 30)
+
+
+def test_nearby_searches_share_an_entry_covering_them():
+    cache = SearchCache(MemoryCacheBackend())
+
+    async def scenario():
+        first = await area(cache)
+        nearby = await area(cache, (BOA_VIAGEM[0] + 0.0001, BOA_VIAGEM[1] - 0.0001), radius=700)
+        assert first == nearby
+        # The widened radius covers every search from anywhere in the cell
+        assert first.radius >= 1000 + 0.005 * 111195 * 2**0.5 / 2 - 1
+
+    asyncio.run(scenario())
+
+
+def test_writes_only_invalidate_nearby_entries():
+    cache = SearchCache(MemoryCacheBackend())
+
+    async def scenario():
+        near, far = await area(cache), await area(cache, CIN)
+        await cache.invalidate({"latitude": BOA_VIAGEM[0] + 0.002, "longitude": BOA_VIAGEM[1]})
+        assert (await area(cache)).key != near.key
+        assert (await area(cache, CIN)).key == far.key
+
+    asyncio.run(scenario())
+
+
+def test_aware_departure_times_share_the_naive_utc_entry():
+    cache = SearchCache(MemoryCacheBackend())
+    aware = NOW.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=-3)))
+
+    async def scenario():
+        naive = await area(cache)
+        assert await cache.area(BOA_VIAGEM, CIN, 800, aware, aware, None, 1) == (
+            await cache.area(BOA_VIAGEM, CIN, 800, NOW, NOW, None, 1)
+        )
+        assert (await cache.area(BOA_VIAGEM, CIN, 800, aware, None, None, 1)) == naive
+
+    asyncio.run(scenario())
+
+
+def test_load_decodes_candidates_once_per_entry():
+    cache = SearchCache(MemoryCacheBackend())
+    start = datetime(2030, 1, 1, 7, 30)
+    candidate = ("id", -34.9, -8.1, -34.95, -8.05, start, None, NOW, NOW, "driver", None)
+
+    async def scenario():
+        entry = await area(cache)
+
+        async def loader():
+            return pack_candidates([candidate], ['{"id":"id"}'])
+
+        first = await cache.load(entry, loader)
+        assert first.candidates == [candidate]
+        assert first.coords.tolist() == [[-34.9, -8.1, -34.95, -8.05]]
+        assert await cache.load(entry, loader) is first
+
+        async def crowded():
+            return TOO_MANY
+
+        assert await cache.load(await area(cache, CIN), crowded) is None
+
+    asyncio.run(scenario())
+
+
+def test_departs_between_matches_recurring_departures():
+    now = utc_now().replace(microsecond=0)
+    first = now - timedelta(days=now.weekday() + 7, hours=1)  # a past Monday
+    departure = first + timedelta(weeks=2)  # the next one after now
+    assert departs_between(first, ["monday"], departure, departure + timedelta(minutes=1))
+    assert not departs_between(
+        first, ["monday"], departure + timedelta(minutes=1), departure + timedelta(days=6)
+    )
+    assert not departs_between(first, None, now)
+    assert departs_between(now + timedelta(days=60), None, now)
+
+
+async def searches_around_a_driver_update():
+    import httpx
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from app.database import async_engine, create_db_and_tables
+    from app.main import app
+    from app.models.user import User
+    from app.utils.auth_utils import auth_bearer
+
+    create_db_and_tables()
+    app.dependency_overrides[auth_bearer] = lambda: None
+
+    driver = User(
+        id=str(uuid4()),
+        name="Driver",
+        email=f"{uuid4()}@cin.ufpe.br",
+        phone="+5581999999999",
+        photo="",
+        gender="",
+        score=5.0,
+    )
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        session.add(driver)
+        await session.commit()
+
+    origin = {"latitude": BOA_VIAGEM[0], "longitude": BOA_VIAGEM[1]}
+    destination = {"latitude": CIN[0], "longitude": CIN[1]}
+    search = {
+        "origin_latitude": BOA_VIAGEM[0],
+        "origin_longitude": BOA_VIAGEM[1],
+        "destination_latitude": CIN[0],
+        "destination_longitude": CIN[1],
+        "radius": 800,
+    }
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/travel/",
+                json={
+                    "id_driver": driver.id,
+                    "origin": origin,
+                    "destination": destination,
+                    "days_of_week": None,
+                    "price": 5.0,
+                    "available_seats": 3,
+                    "status": "open",
+                    "description": "",
+                    "start_time": "2030-01-01T07:30:00",
+                },
+            )
+            travel_id = response.json()["id"]
+            before = await client.get("/travel/", params=search)
+
+            await client.patch(
+                f"/users/{driver.id}",
+                data={
+                    "name": "Renamed",
+                    "email": driver.email,
+                    "phone": "+5581888888888",
+                    "gender": "",
+                },
+            )
+            after = await client.get("/travel/", params=search)
+            await client.delete(f"/travel/{travel_id}")
+    finally:
+        app.dependency_overrides.clear()
+        async with AsyncSession(async_engine) as session:
+            await session.delete(await session.get(User, driver.id))
+            await session.commit()
+        await async_engine.dispose()
+
+    return before, after
+
+
+@pytest.mark.skipif(
+    not os.getenv("POSTGRES_HOST"), reason="requires a local Postgres (POSTGRES_HOST)"
+)
+def test_driver_updates_expire_cached_searches():
+    before, after = asyncio.run(searches_around_a_driver_update())
+
+    assert [item["driver_name"] for item in before.json()["items"]] == ["Driver"]
+    assert [(item["driver_name"], item["driver_phone"]) for item in after.json()["items"]] == [
+        ("Renamed", "+5581888888888")
+    ]
+    assert after.headers["ETag"] != before.headers["ETag"]
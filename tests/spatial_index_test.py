@@ -0,0 +1,83 @@
+from app.utils.spatial_index import TravelSpatialIndex
+
+CIN = {"latitude": -8.0556, "longitude": -34.9516}
+BOA_VIAGEM = {"latitude": -8.1196, "longitude": -34.9010}
+OLINDA = {"latitude": -8.0089, "longitude": -34.8553}
+
+
+def test_candidates_match_both_ends():
+    index = TravelSpatialIndex(cell_degrees=0.01)
+    index.load([])
+    index.add("to-cin", BOA_VIAGEM, CIN)
+    index.add("to-olinda", BOA_VIAGEM, OLINDA)
+
+    found = index.candidates(
+        (BOA_VIAGEM["latitude"], BOA_VIAGEM["longitude"]),
+        (CIN["latitude"], CIN["longitude"]),
+        500,
+    )
+
+    assert found == {"to-cin"}
+
+
+def test_update_moves_travel_between_cells():
+    index = TravelSpatialIndex(cell_degrees=0.01)
+    index.load([])
+    index.add("ride", BOA_VIAGEM, CIN)
+    index.update("ride", destination=OLINDA)
+
+    cin_search = (
+        (BOA_VIAGEM["latitude"], BOA_VIAGEM["longitude"]),
+        (CIN["latitude"], CIN["longitude"]),
+    )
+    olinda_search = (
+        (BOA_VIAGEM["latitude"], BOA_VIAGEM["longitude"]),
+        (OLINDA["latitude"], OLINDA["longitude"]),
+    )
+    assert index.candidates(*cin_search, 500) == set()
+    assert index.candidates(*olinda_search, 500) == {"ride"}
+
+    index.remove("ride")
+    assert index.candidates(*olinda_search, 500) == set()
+
+
+def test_load_replaces_contents():
+    index = TravelSpatialIndex(cell_degrees=0.01)
+    index.load([])
+    index.add("stale", BOA_VIAGEM, CIN)
+    index.load(
+        [
+            ("fresh", OLINDA["latitude"], OLINDA["longitude"], CIN["latitude"], CIN["longitude"]),
+            ("no-coordinates", None, None, None, None),
+        ]
+    )
+
+    assert index.ready
+    found = index.candidates(
+        (OLINDA["latitude"], OLINDA["longitude"]), (CIN["latitude"], CIN["longitude"]), 50_000
+    )
+    assert found == {"fresh"}
+
+
+def test_writes_are_ignored_until_the_index_is_loaded():
+    index = TravelSpatialIndex(cell_degrees=0.01)
+    index.add("ride", BOA_VIAGEM, CIN)
+    index.update("ride", destination=OLINDA)
+    index.load([])
+
+    assert (
+        index.candidates(
+            (BOA_VIAGEM["latitude"], BOA_VIAGEM["longitude"]),
+            (CIN["latitude"], CIN["longitude"]),
+            500,
+        )
+        == set()
+    )
+
+
+def test_update_ignores_travels_not_in_the_index():
+    index = TravelSpatialIndex(cell_degrees=0.01)
+    index.load([])
+    index.update("unknown", destination=OLINDA)
+
+    assert not index._origins.positions and not index._destinations.positions
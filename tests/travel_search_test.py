@@ -0,0 +1,146 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+# Needs a disposable Postgres configured through the POSTGRES_* variables
+pytestmark = pytest.mark.skipif(
+    not os.getenv("POSTGRES_HOST"), reason="requires a local Postgres (POSTGRES_HOST)"
+)
+
+# Away from the other tests' rides
+ORIGIN = {"latitude": -9.6658, "longitude": -35.7353}
+DESTINATION = {"latitude": -9.5500, "longitude": -35.7700}
+RADIUS = 1000
+# Inside the search's bounding box, outside its circle
+CORNER = {"latitude": ORIGIN["latitude"] + 0.0085, "longitude": ORIGIN["longitude"] + 0.0085}
+SEARCH = {
+    "origin_latitude": ORIGIN["latitude"],
+    "origin_longitude": ORIGIN["longitude"],
+    "destination_latitude": DESTINATION["latitude"],
+    "destination_longitude": DESTINATION["longitude"],
+    "radius": RADIUS,
+}
+
+
+async def search_rides(read):
+    """
+    Store rides around SEARCH, half of them created at the same instant, and
+    return (the ids that match, newest first, and what read(client) returns).
+    """
+    import httpx
+    from sqlmodel import delete
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from app.database import async_engine, create_db_and_tables
+    from app.main import app
+    from app.models.travel import Travel, coordinate_fields
+    from app.models.user import User
+    from app.utils.auth_utils import auth_bearer
+    from app.utils.search_cache import search_cache
+
+    create_db_and_tables()
+    app.dependency_overrides[auth_bearer] = lambda: None
+
+    driver = User(
+        id=str(uuid4()),
+        name="Driver",
+        email=f"{uuid4()}@cin.ufpe.br",
+        phone="+5581999999999",
+        photo="",
+        gender="",
+        score=5.0,
+    )
+    now = datetime(2026, 10, 19, 7, 30)
+    travels = []
+    for i in range(24):
+        origin = CORNER if i % 6 == 5 else ORIGIN
+        travels.append(
+            Travel(
+                id=str(uuid4()),
+                id_driver=driver.id,
+                origin=origin,
+                destination=DESTINATION,
+                **coordinate_fields({"origin": origin, "destination": DESTINATION}),
+                days_of_week=[],
+                price=5.0,
+                available_seats=3,
+                status="open",
+                description="",
+                start_time=datetime(2030, 1, 1, 7, 30),
+                # Ties on created_at are broken by id
+                created_at=now if i % 2 else now - timedelta(minutes=i),
+            )
+        )
+    expected = [
+        travel.id
+        for travel in sorted(travels, key=lambda travel: (travel.created_at, travel.id))[::-1]
+        if travel.origin == ORIGIN
+    ]
+
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        session.add(driver)
+        await session.commit()
+        session.add_all(travels)
+        await session.commit()
+    await search_cache.invalidate(ORIGIN, CORNER)
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            found = await read(client)
+    finally:
+        app.dependency_overrides.clear()
+        async with AsyncSession(async_engine) as session:
+            await session.exec(delete(Travel).where(Travel.id_driver == driver.id))
+            await session.delete(await session.get(User, driver.id))
+            await session.commit()
+        await async_engine.dispose()
+
+    return expected, found
+
+
+async def walk_pages(client):
+    pages = []
+    cursor = None
+    while True:
+        params = {**SEARCH, "limit": 4, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/travel/", params=params)).json()
+        pages.append([item["id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_pages_cover_every_ride_once(monkeypatch, cached):
+    monkeypatch.setattr("app.routes.travel.SEARCH_CACHE_ENABLED", cached)
+
+    expected, pages = asyncio.run(search_rides(walk_pages))
+
+    assert len(expected) == 20
+    assert [travel_id for page in pages for travel_id in page] == expected
+    assert all(len(page) == 4 for page in pages[:-1])
+
+
+async def read_stream(client):
+    import json
+
+    response = await client.get("/travel/stream", params=SEARCH)
+    *lines, last = response.text.split("\n")
+    return response.headers["content-type"], last, [json.loads(line) for line in lines]
+
+
+def test_stream_sends_one_json_object_per_line(monkeypatch):
+    # Rides come in several partitions, each written as one chunk
+    monkeypatch.setattr("app.routes.travel.STREAM_BATCH_SIZE", 5)
+
+    expected, (content_type, last, items) = asyncio.run(search_rides(read_stream))
+
+    assert content_type == "application/x-ndjson"
+    # Every line, the last one included, ends with a newline
+    assert last == ""
+    assert [item["id"] for item in items] == expected
+    assert {item["driver_name"] for item in items} == {"Driver"}
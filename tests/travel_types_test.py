@@ -0,0 +1,131 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+from app.types.travel import TravelBulkPatchItem, TravelCreate, naive_utc, utc_now
+
+TRAVEL = {
+    "id_driver": "driver",
+    "origin": {"latitude": -8.1196, "longitude": -34.9010},
+    "destination": {"latitude": -8.0556, "longitude": -34.9516},
+    "days_of_week": None,
+    "price": 5.0,
+}
+
+
+def test_aware_start_times_become_naive_utc():
+    for start_time in ("2030-01-01T07:30:00Z", "2030-01-01T04:30:00-03:00"):
+        travel = TravelCreate(**TRAVEL, start_time=start_time)
+        assert travel.start_time == datetime(2030, 1, 1, 7, 30)
+
+    patch = TravelBulkPatchItem(id="travel", start_time="2030-01-01T10:30:00+03:00")
+    assert patch.start_time == datetime(2030, 1, 1, 7, 30)
+
+
+def test_naive_times_are_kept():
+    assert naive_utc(datetime(2030, 1, 1, 7, 30)) == datetime(2030, 1, 1, 7, 30)
+    assert TravelCreate(**TRAVEL, start_time="2030-01-01T07:30:00").start_time == datetime(
+        2030, 1, 1, 7, 30
+    )
+
+
+def test_utc_now_ignores_the_server_timezone(monkeypatch):
+    monkeypatch.setenv("TZ", "America/Recife")
+    time.tzset()
+    try:
+        now = utc_now()
+        assert now.tzinfo is None
+        assert abs(now - datetime.now(timezone.utc).replace(tzinfo=None)) < timedelta(seconds=1)
+        assert abs(datetime.now() + timedelta(hours=3) - now) < timedelta(seconds=1)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+async def aware_search_statuses():
+    import httpx
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from app.database import async_engine, create_db_and_tables
+    from app.main import app
+    from app.models.user import User
+    from app.utils.auth_utils import auth_bearer
+
+    create_db_and_tables()
+    app.dependency_overrides[auth_bearer] = lambda: None
+
+    driver = User(
+        id=str(uuid4()),
+        name="Driver",
+        email=f"{uuid4()}@cin.ufpe.br",
+        phone="+5581999999999",
+        photo="",
+        gender="",
+        score=5.0,
+    )
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        session.add(driver)
+        await session.commit()
+
+    travel = {
+        **TRAVEL,
+        "id_driver": driver.id,
+        "available_seats": 3,
+        "status": "open",
+        "description": "",
+        "start_time": "2030-01-01T07:30:00Z",
+    }
+    search = {
+        "origin_latitude": TRAVEL["origin"]["latitude"],
+        "origin_longitude": TRAVEL["origin"]["longitude"],
+        "destination_latitude": TRAVEL["destination"]["latitude"],
+        "destination_longitude": TRAVEL["destination"]["longitude"],
+        "radius": 1000,
+        "departure_after": "2029-12-31T21:00:00-03:00",
+    }
+    statuses = {}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/travel/", json=travel)
+            statuses["create"] = response.status_code
+            travel_id = response.json()["id"]
+
+            response = await client.patch(
+                f"/travel/{travel_id}", json={"start_time": "2030-01-01T10:30:00+03:00"}
+            )
+            statuses["update"] = (response.status_code, response.json()["start_time"])
+
+            response = await client.get("/travel/", params=search)
+            statuses["search"] = (response.status_code, len(response.json()["items"]))
+
+            response = await client.get(
+                "/travel/", params={**search, "top_k": 5, "departure_time": "2030-01-01T07:00Z"}
+            )
+            statuses["top_k"] = (response.status_code, len(response.json()["items"]))
+
+            await client.delete(f"/travel/{travel_id}")
+    finally:
+        app.dependency_overrides.clear()
+        async with AsyncSession(async_engine) as session:
+            await session.delete(await session.get(User, driver.id))
+            await session.commit()
+        await async_engine.dispose()
+
+    return statuses
+
+
+@pytest.mark.skipif(
+    not os.getenv("POSTGRES_HOST"), reason="requires a local Postgres (POSTGRES_HOST)"
+)
+def test_routes_accept_aware_datetimes():
+    assert asyncio.run(aware_search_statuses()) == {
+        "create": 201,
+        "update": (200, "2030-01-01T07:30:00"),
+        "search": (200, 1),
+        "top_k": (200, 1),
+    }
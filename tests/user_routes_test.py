@@ -0,0 +1,96 @@
+import asyncio
+import os
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+
+
+class StubS3:
+    """Records calls; while an upload runs, another writer updates the user."""
+
+    def __init__(self, engine, user_id):
+        self.engine = engine
+        self.user_id = user_id
+        self.calls = []
+
+    def upload_fileobj(self, **kwargs):
+        self.calls.append("upload")
+        with self.engine.begin() as connection:
+            # Fails instead of waiting if the PATCH still held the row
+            connection.execute(text("SET LOCAL lock_timeout = '1s'"))
+            connection.execute(
+                text('UPDATE "user" SET name = :name, updated_at = :now WHERE id = :id'),
+                {"name": "Concurrent", "now": datetime.now(), "id": self.user_id},
+            )
+
+    def delete_object(self, **kwargs):
+        self.calls.append("delete")
+
+
+async def patch_during_concurrent_write(monkeypatch):
+    import httpx
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from app.database import async_engine, create_db_and_tables, engine
+    from app.main import app
+    from app.models.user import User
+    from app.utils.auth_utils import auth_bearer
+
+    create_db_and_tables()
+    app.dependency_overrides[auth_bearer] = lambda: None
+
+    user = User(
+        id=str(uuid4()),
+        name="Passenger",
+        email=f"{uuid4()}@cin.ufpe.br",
+        phone="+5581999999999",
+        photo="",
+        gender="",
+        score=5.0,
+    )
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        session.add(user)
+        await session.commit()
+
+    s3 = StubS3(engine, user.id)
+    monkeypatch.setattr("app.utils.utils.get_aws_client", lambda service: s3)
+    form = {"name": "Mine", "email": user.email, "phone": user.phone, "gender": ""}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            etag = (await client.get(f"/users/{user.id}")).headers["ETag"]
+            response = await client.patch(
+                f"/users/{user.id}",
+                data=form,
+                files={"file": ("photo.png", b"png", "image/png")},
+                headers={"If-Match": etag},
+            )
+            missing = await client.patch(
+                f"/users/{uuid4()}", data=form, files={"file": ("photo.png", b"png", "image/png")}
+            )
+        async with AsyncSession(async_engine) as session:
+            name = (await session.get(User, user.id)).name
+    finally:
+        app.dependency_overrides.clear()
+        async with AsyncSession(async_engine) as session:
+            await session.delete(await session.get(User, user.id))
+            await session.commit()
+        await async_engine.dispose()
+
+    return response.status_code, missing.status_code, name, s3.calls
+
+
+@pytest.mark.skipif(
+    not os.getenv("POSTGRES_HOST"), reason="requires a local Postgres (POSTGRES_HOST)"
+)
+def test_if_match_update_does_not_lock_the_user_during_the_upload(monkeypatch):
+    assert asyncio.run(patch_during_concurrent_write(monkeypatch)) == (
+        412,
+        404,
+        "Concurrent",
+        # Neither the concurrent writer's photo is deleted, nor one uploaded
+        # for a user that does not exist
+        ["upload"],
+    )
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from app.utils.utils import haversine_distance, haversine_distances, top_k_indices, within_radius
+
+CIN = (-34.9516, -8.0556)
+BOA_VIAGEM = (-34.9010, -8.1196)
+OLINDA = (-34.8553, -8.0089)
+
+
+def test_haversine_distances_matches_scalar_version():
+    points = [CIN, BOA_VIAGEM, OLINDA]
+
+    distances = haversine_distances(points, CIN)
+
+    expected = [haversine_distance(point, CIN) for point in points]
+    assert distances == pytest.approx(expected)
+
+
+def test_within_radius_uses_exact_distance():
+    rng = np.random.default_rng(42)
+    points = np.column_stack([rng.uniform(-35.05, -34.85, 1000), rng.uniform(-8.15, -7.95, 1000)])
+
+    mask = within_radius(points, CIN, 5000)
+
+    expected = [haversine_distance(tuple(point), CIN) <= 5000 for point in points]
+    assert mask.tolist() == expected
+    assert mask.any() and not mask.all()
+
+
+def test_within_radius_empty_input():
+    assert within_radius([], CIN, 1000).shape == (0,)
+
+
+def test_top_k_indices_returns_lowest_scores_in_order():
+    scores = [5.0, 1.0, 4.0, 2.0, 3.0]
+
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 4]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 4, 2, 0]
+    assert top_k_indices([], 3).tolist() == []